@@ -514,7 +514,12 @@ def main():
     results = []
     total_start_time = time.time()
 
-    with ThreadPoolExecutor(max_workers=min(len(enabled_analyzers), 10)) as executor:
+    # One worker per analyzer plus one for Cost Explorer, so every analyzer's
+    # AWS calls overlap instead of queueing behind a fixed-size pool
+    with ThreadPoolExecutor(max_workers=len(enabled_analyzers) + 1) as executor:
+        # The Cost Explorer lookup is independent of the analyzers, so start it now
+        actual_costs_future = executor.submit(get_actual_aws_costs)
+
         # Submit all analyzer tasks
         future_to_analyzer = {
             executor.submit(run_analyzer_with_timing, analyzer, reports_path): analyzer
@@ -575,7 +580,7 @@ def main():
 
     # Get actual AWS costs from Cost Explorer instead of summing individual analyzer costs
     print("Fetching actual AWS costs from Cost Explorer...")
-    actual_monthly, actual_yearly = get_actual_aws_costs()
+    actual_monthly, actual_yearly = actual_costs_future.result()
 
     if actual_monthly is not None:
         total_current_monthly = actual_monthly
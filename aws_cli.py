@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+AWS CLI helpers shared by the cost analyzers.
+Resolves AWS credentials once per run and hands them to every AWS CLI call.
+READ-ONLY - Makes no changes to AWS resources.
+"""
+
+import subprocess
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# CloudWatch GetMetricData accepts at most 500 queries per request
+MAX_METRIC_DATA_QUERIES = 500
+
+# Concurrent GetMetricData requests
+MAX_WORKERS = 16
+
+# On-demand prices from the AWS Pricing API are cached between runs
+PRICING_CACHE_FILE = Path.home() / '.cache' / 'aws-cost-analysis' / 'pricing.json'
+PRICING_CACHE_TTL_SECONDS = 7 * 24 * 3600
+
+# The Pricing API is only served from a few regions
+PRICING_API_REGION = 'us-east-1'
+
+# Throttled calls are retried by the AWS CLI itself, with these settings unless
+# already set in the environment.
+# Adaptive mode also rate-limits client-side, which suits the concurrent fan-outs.
+CLI_RETRY_MODE = 'adaptive'
+CLI_MAX_ATTEMPTS = 10
+
+# Environment for AWS CLI calls, resolved on first use
+_session_env = None
+_session_lock = threading.Lock()
+
+# Pricing cache, loaded on first use; lookups that found no price are only remembered for this run
+_price_cache = None
+_price_misses = set()
+_price_lock = threading.Lock()
+
+
+def get_session_env() -> Dict[str, str]:
+    """Get the environment shared by all AWS CLI calls, built once per run.
+
+    It carries already-resolved AWS credentials, since every AWS CLI process
+    otherwise walks the credential chain again (SSO, assume-role, instance
+    metadata), and the CLI retry settings. The inherited credentials are kept
+    when they cannot be exported (AWS CLI older than v2.9).
+    """
+    global _session_env
+
+    with _session_lock:
+        if _session_env is None:
+            env = dict(os.environ)
+            env.setdefault('AWS_RETRY_MODE', CLI_RETRY_MODE)
+            env.setdefault('AWS_MAX_ATTEMPTS', str(CLI_MAX_ATTEMPTS))
+            try:
+                result = subprocess.run(
+                    ['aws', 'configure', 'export-credentials', '--format', 'process'],
+                    capture_output=True,
+                    text=True,
+                    check=True
+                )
+                credentials = json.loads(result.stdout)
+                env['AWS_ACCESS_KEY_ID'] = credentials['AccessKeyId']
+                env['AWS_SECRET_ACCESS_KEY'] = credentials['SecretAccessKey']
+                if credentials.get('SessionToken'):
+                    env['AWS_SESSION_TOKEN'] = credentials['SessionToken']
+                else:
+                    env.pop('AWS_SESSION_TOKEN', None)
+            except (subprocess.CalledProcessError, FileNotFoundError, KeyError, json.JSONDecodeError):
+                pass
+            _session_env = env
+
+    return _session_env
+
+
+def run_command(cmd: List[str]) -> Tuple[bool, str]:
+    """Run a shell command and return success status and output."""
+    try:
+        result = subprocess.run(
+            cmd,
+            capture_output=True,
+            text=True,
+            check=True,
+            env=get_session_env()
+        )
+        return True, result.stdout
+    except subprocess.CalledProcessError as e:
+        return False, e.stderr
+    except FileNotFoundError:
+        return False, "AWS CLI not found. Please install it first."
+
+
+def run_list_command(cmd: List[str], result_key: str) -> Tuple[bool, List, str]:
+    """Run a list/describe AWS CLI command, which pages through all results itself, and return its items."""
+    success, output = run_command(cmd)
+    if not success:
+        return False, [], output
+
+    try:
+        data = json.loads(output) if output and not output.isspace() else {}
+    except json.JSONDecodeError as e:
+        return False, [], f"Error parsing AWS CLI output: {e}"
+
+    return True, data.get(result_key) or [], ''
+
+
+def metric_window(days: int) -> Tuple[datetime, datetime]:
+    """Return the (start, end) of a metric window ending at the current hour."""
+    # CloudWatch answers hour-aligned queries faster
+    end = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return end - timedelta(days=days), end
+
+
+def get_metric_data_batch(queries: List[Dict], start_time: datetime, end_time: datetime,
+                          region: Optional[str] = None) -> Dict[str, List[float]]:
+    """Run one CloudWatch GetMetricData request and return values keyed by query Id.
+
+    Expression queries can return several series, so their values are keyed
+    by '<Id>:<Label>' instead.
+    """
+    values = {}
+    expression_ids = {query['Id'] for query in queries if 'Expression' in query}
+
+    # Large batches exceed the command-line argument limit, so pass them via a file
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+        json.dump(queries, f)
+        queries_file = f.name
+
+    try:
+        success, output = run_command([
+            'aws', 'cloudwatch', 'get-metric-data',
+            '--metric-data-queries', f'file://{queries_file}',
+            # Epoch seconds are unambiguous about the time zone
+            '--start-time', str(int(start_time.timestamp())),
+            '--end-time', str(int(end_time.timestamp())),
+            '--output', 'json'
+        ] + (['--region', region] if region else []))
+    finally:
+        os.unlink(queries_file)
+
+    if not success:
+        print(f"  Warning: Could not fetch CloudWatch metrics: {output.strip()}")
+        return values
+
+    try:
+        data = json.loads(output)
+        # The CLI merges paginated responses, so an Id may appear more than once
+        for result in data.get('MetricDataResults', []):
+            key = result['Id']
+            if key in expression_ids:
+                key = f"{key}:{result.get('Label', '')}"
+            values.setdefault(key, []).extend(result.get('Values', []))
+    except (KeyError, json.JSONDecodeError) as e:
+        print(f"  Warning: Error parsing CloudWatch metric data: {e}")
+
+    return values
+
+
+def get_metric_data(queries: List[Dict], start_time: datetime, end_time: datetime,
+                    region: Optional[str] = None) -> Dict[str, List[float]]:
+    """Run batched CloudWatch GetMetricData queries concurrently and return values keyed by query Id."""
+    batches = [
+        queries[i:i + MAX_METRIC_DATA_QUERIES]
+        for i in range(0, len(queries), MAX_METRIC_DATA_QUERIES)
+    ]
+    if not batches:
+        return {}
+
+    values = {}
+    with ThreadPoolExecutor(max_workers=min(len(batches), MAX_WORKERS)) as executor:
+        futures = [
+            executor.submit(get_metric_data_batch, batch, start_time, end_time, region)
+            for batch in batches
+        ]
+        for future in futures:
+            values.update(future.result())
+
+    return values
+
+
+def load_pricing_cache() -> Dict:
+    """Load cached on-demand prices, or an empty cache if none is usable."""
+    try:
+        with open(PRICING_CACHE_FILE) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def write_json_atomic(path: Path, data: Dict):
+    """Write JSON to a file atomically, creating its directory if needed."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Analyzers may run side by side, so each process writes its own temporary file
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def save_pricing_cache(cache: Dict):
+    """Write the on-demand price cache atomically."""
+    try:
+        write_json_atomic(PRICING_CACHE_FILE, cache)
+    except OSError as e:
+        print(f"  Warning: Could not write pricing cache: {e}")
+
+
+def parse_on_demand_prices(output: str) -> List[float]:
+    """Extract the first-tier on-demand USD price of each product in pricing get-products output."""
+    prices = []
+    try:
+        for product in json.loads(output).get('PriceList', []):
+            # Each product is returned as a JSON document of its own
+            if isinstance(product, str):
+                product = json.loads(product)
+            for term in product.get('terms', {}).get('OnDemand', {}).values():
+                for dimension in term.get('priceDimensions', {}).values():
+                    if dimension.get('beginRange', '0') == '0':
+                        prices.append(float(dimension['pricePerUnit']['USD']))
+    except (KeyError, ValueError, AttributeError):
+        pass
+    return prices
+
+
+def get_on_demand_price(service_code: str, filters: Dict[str, str]) -> Optional[float]:
+    """Get an on-demand USD price from the AWS Pricing API, cached between runs.
+
+    Returns None when no product matches the filters, the matching products disagree
+    on the price, or the API cannot be reached.
+    """
+    global _price_cache
+
+    key = service_code + ':' + ','.join(f"{field}={value}" for field, value in sorted(filters.items()))
+    now = time.time()
+
+    with _price_lock:
+        if _price_cache is None:
+            _price_cache = load_pricing_cache()
+        entry = _price_cache.get(key)
+        if entry and now - entry.get('fetched', 0) < PRICING_CACHE_TTL_SECONDS:
+            return entry['price']
+        if key in _price_misses:
+            return None
+
+    success, output = run_command([
+        'aws', 'pricing', 'get-products',
+        '--region', PRICING_API_REGION,
+        '--service-code', service_code,
+        '--filters', json.dumps([
+            {'Type': 'TERM_MATCH', 'Field': field, 'Value': value}
+            for field, value in filters.items()
+        ]),
+        '--output', 'json'
+    ])
+    prices = set(parse_on_demand_prices(output)) if success else set()
+
+    # Filters that do not pin down a single product would cache an arbitrary one
+    price = prices.pop() if len(prices) == 1 else None
+    if len(prices) > 1:
+        print(f"  Warning: Several {service_code} prices match {key}, not using the Pricing API for it")
+
+    with _price_lock:
+        if price is None:
+            _price_misses.add(key)
+        else:
+            _price_cache[key] = {'fetched': now, 'price': price}
+            save_pricing_cache(_price_cache)
+
+    return price
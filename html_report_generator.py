@@ -4,33 +4,543 @@ HTML Report Generator for AWS Cost Analysis
 Creates a professional HTML report card with charts and visualizations.
 """
 
+import gzip
 import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List
 
+# Report stylesheet (kept readable here, minified once at import)
+_CSS = """
+* {
+    margin: 0;
+    padding: 0;
+    box-sizing: border-box;
+}
+
+body {
+    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, Cantarell, sans-serif;
+    background: #f5f7fa;
+    padding: 20px;
+    color: #2c3e50;
+}
+
+.container {
+    max-width: 1200px;
+    margin: 0 auto;
+    background: white;
+    border-radius: 8px;
+    box-shadow: 0 2px 8px rgba(0,0,0,0.1);
+    overflow: hidden;
+}
+
+.header {
+    background: #2c5aa0;
+    color: white;
+    padding: 40px;
+    text-align: center;
+}
+
+.header h1 {
+    font-size: 2.5em;
+    margin-bottom: 10px;
+    font-weight: 700;
+}
+
+.header .subtitle {
+    font-size: 1.1em;
+    opacity: 0.9;
+}
+
+.header .date {
+    margin-top: 15px;
+    font-size: 0.95em;
+    opacity: 0.8;
+}
+
+.summary {
+    background: #34495e;
+    color: white;
+    padding: 40px;
+    text-align: center;
+}
+
+.summary-grid {
+    display: grid;
+    grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
+    gap: 30px;
+    margin-top: 30px;
+}
+
+.summary-card {
+    background: rgba(255, 255, 255, 0.15);
+    padding: 25px;
+    border-radius: 8px;
+    border: 1px solid rgba(255, 255, 255, 0.2);
+}
+
+.summary-card .label {
+    font-size: 0.9em;
+    opacity: 0.9;
+    margin-bottom: 10px;
+}
+
+.summary-card .value {
+    font-size: 2.5em;
+    font-weight: 700;
+    line-height: 1;
+}
+
+.summary-card .subvalue {
+    font-size: 0.85em;
+    margin-top: 8px;
+    opacity: 0.85;
+}
+
+.content {
+    padding: 40px;
+}
+
+.section {
+    margin-bottom: 40px;
+}
+
+.section-title {
+    font-size: 1.8em;
+    font-weight: 700;
+    margin-bottom: 20px;
+    color: #2c5aa0;
+    border-bottom: 3px solid #2c5aa0;
+    padding-bottom: 10px;
+}
+
+.category {
+    margin-bottom: 30px;
+    border: 1px solid #dce3e8;
+    border-radius: 8px;
+    overflow: hidden;
+}
+
+.category-header {
+    background: #3b6ea5;
+    color: white;
+    padding: 20px;
+    display: flex;
+    justify-content: space-between;
+    align-items: center;
+}
+
+.category-header h3 {
+    font-size: 1.4em;
+    font-weight: 600;
+}
+
+.category-header .total {
+    font-size: 1.2em;
+    font-weight: 700;
+}
+
+.category-items {
+    padding: 0;
+}
+
+.item {
+    padding: 20px;
+    border-bottom: 1px solid #e0e0e0;
+    display: grid;
+    grid-template-columns: auto 1fr auto;
+    gap: 20px;
+    align-items: center;
+    transition: background 0.2s;
+}
+
+.item:hover {
+    background: #f8f9fa;
+}
+
+.item:last-child {
+    border-bottom: none;
+}
+
+.item .status {
+    width: 40px;
+    height: 40px;
+    border-radius: 50%;
+    display: flex;
+    align-items: center;
+    justify-content: center;
+    font-size: 1.1em;
+}
+
+.item .status.optimized {
+    background: #27ae60;
+    color: white;
+}
+
+.item .status.opportunity {
+    background: #e67e22;
+    color: white;
+}
+
+.item .info {
+    flex: 1;
+}
+
+.item .name {
+    font-size: 1.1em;
+    font-weight: 600;
+    margin-bottom: 5px;
+}
+
+.item .description {
+    font-size: 0.9em;
+    color: #666;
+}
+
+.item .savings {
+    text-align: right;
+}
+
+.item .savings .monthly {
+    font-size: 0.9em;
+    color: #666;
+    margin-bottom: 5px;
+}
+
+.item .savings .yearly {
+    font-size: 1.4em;
+    font-weight: 700;
+    color: #27ae60;
+}
+
+.opportunities {
+    background: #fef5e7;
+    border: 2px solid #e67e22;
+    border-radius: 8px;
+    padding: 30px;
+}
+
+.opportunity-list {
+    list-style: none;
+    counter-reset: opportunity-counter;
+}
+
+.opportunity-item {
+    counter-increment: opportunity-counter;
+    padding: 20px;
+    margin-bottom: 15px;
+    background: white;
+    border-radius: 8px;
+    box-shadow: 0 2px 8px rgba(0,0,0,0.1);
+    display: grid;
+    grid-template-columns: auto 1fr auto;
+    gap: 20px;
+    align-items: center;
+}
+
+.opportunity-item:before {
+    content: counter(opportunity-counter);
+    background: #e67e22;
+    color: white;
+    width: 40px;
+    height: 40px;
+    border-radius: 50%;
+    display: flex;
+    align-items: center;
+    justify-content: center;
+    font-weight: 700;
+    font-size: 1.2em;
+}
+
+.opportunity-info {
+    flex: 1;
+}
+
+.opportunity-name {
+    font-size: 1.1em;
+    font-weight: 600;
+    margin-bottom: 5px;
+    color: #2c3e50;
+}
+
+.opportunity-details {
+    font-size: 0.9em;
+    color: #7f8c8d;
+}
+
+.opportunity-savings {
+    font-size: 1.5em;
+    font-weight: 700;
+    color: #27ae60;
+    text-align: right;
+}
+
+.footer {
+    background: #f8f9fa;
+    padding: 30px;
+    text-align: center;
+    color: #666;
+    font-size: 0.9em;
+}
+
+.footer .warning {
+    background: #fef5e7;
+    border: 1px solid #e67e22;
+    border-radius: 8px;
+    padding: 15px;
+    margin-top: 20px;
+    color: #7d6608;
+}
+
+.progress-bar {
+    background: #e0e0e0;
+    border-radius: 10px;
+    height: 20px;
+    overflow: hidden;
+    margin-top: 10px;
+}
+
+.progress-fill {
+    background: #27ae60;
+    height: 100%;
+    transition: width 0.5s;
+}
+
+@media print {
+    @page {
+        margin: 0.75in;
+        size: letter portrait;
+    }
+
+    body {
+        background: white !important;
+        padding: 0;
+        color: #000 !important;
+    }
+
+    .container {
+        max-width: 100%;
+        box-shadow: none !important;
+        border-radius: 0;
+    }
+
+    .header {
+        background: #2c5aa0 !important;
+        -webkit-print-color-adjust: exact;
+        print-color-adjust: exact;
+        color: white !important;
+        page-break-after: avoid;
+        padding: 20px !important;
+    }
+
+    .summary {
+        background: #34495e !important;
+        -webkit-print-color-adjust: exact;
+        print-color-adjust: exact;
+        color: white !important;
+        page-break-after: avoid;
+        page-break-inside: avoid;
+        padding: 20px !important;
+    }
+
+    .summary-grid {
+        gap: 15px !important;
+    }
+
+    .summary-card {
+        background: rgba(255, 255, 255, 0.15) !important;
+        -webkit-print-color-adjust: exact;
+        print-color-adjust: exact;
+        page-break-inside: avoid;
+    }
+
+    .content {
+        padding: 20px 0 !important;
+    }
+
+    .section {
+        page-break-inside: avoid;
+        margin-bottom: 30px !important;
+    }
+
+    .section-title {
+        color: #2c5aa0 !important;
+        -webkit-print-color-adjust: exact;
+        print-color-adjust: exact;
+        page-break-after: avoid;
+    }
+
+    .category {
+        page-break-inside: avoid;
+        border: 1px solid #dce3e8 !important;
+    }
+
+    .category-header {
+        background: #3b6ea5 !important;
+        -webkit-print-color-adjust: exact;
+        print-color-adjust: exact;
+        color: white !important;
+        page-break-after: avoid;
+    }
+
+    .item {
+        page-break-inside: avoid;
+    }
+
+    .item:hover {
+        background: transparent !important;
+    }
+
+    .item .status.optimized {
+        background: #27ae60 !important;
+        -webkit-print-color-adjust: exact;
+        print-color-adjust: exact;
+        color: white !important;
+    }
+
+    .item .status.opportunity {
+        background: #e67e22 !important;
+        -webkit-print-color-adjust: exact;
+        print-color-adjust: exact;
+        color: white !important;
+    }
+
+    .item .savings .yearly {
+        color: #27ae60 !important;
+        -webkit-print-color-adjust: exact;
+        print-color-adjust: exact;
+    }
+
+    .opportunities {
+        background: #fef5e7 !important;
+        border: 2px solid #e67e22 !important;
+        -webkit-print-color-adjust: exact;
+        print-color-adjust: exact;
+        page-break-inside: avoid;
+    }
+
+    .opportunity-item {
+        page-break-inside: avoid;
+    }
+
+    .opportunity-item:before {
+        background: #e67e22 !important;
+        -webkit-print-color-adjust: exact;
+        print-color-adjust: exact;
+        color: white !important;
+    }
+
+    .opportunity-savings {
+        color: #27ae60 !important;
+        -webkit-print-color-adjust: exact;
+        print-color-adjust: exact;
+    }
+
+    .footer {
+        page-break-before: avoid;
+        page-break-inside: avoid;
+    }
+
+    .footer .warning {
+        background: #fef5e7 !important;
+        border: 1px solid #e67e22 !important;
+        -webkit-print-color-adjust: exact;
+        print-color-adjust: exact;
+    }
+
+    /* Hide unnecessary elements in print */
+    .no-print {
+        display: none !important;
+    }
+}
+"""
+
+# Whitespace between tags that spans a line break (template indentation)
+_WS = re.compile(r'>\s*\n\s*<')
+
+
+def _minify_css(css: str) -> str:
+    """Strip comments and redundant whitespace from a stylesheet."""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};:,])\s*', r'\1', css)
+    css = re.sub(r';}', '}', css)
+    return css.strip()
+
+
+_CSS_MIN = _minify_css(_CSS)
+
+
+def _write_file(path: Path, content: str):
+    """Write text content to a file atomically via a temporary file."""
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', buffering=1 << 20) as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def _write_gzip(path: Path, content: str):
+    """Write text content to a gzip-compressed file atomically via a temporary file."""
+    tmp_path = path.with_name(path.name + '.tmp')
+    # Level 1 keeps most of the size reduction at a fraction of the CPU cost
+    with gzip.open(tmp_path, 'wb', compresslevel=1) as f:
+        f.write(content.encode('utf-8'))
+    os.replace(tmp_path, path)
+
 
 def generate_html_report(results: List[Dict], reports_path: Path, total_monthly: float, total_yearly: float, total_current_monthly: float, total_current_yearly: float):
     """Generate HTML report with styling and charts."""
 
-    # Calculate category totals
+    # Calculate category totals and the JSON analyses list in a single pass
+    successful = []
     categories = {}
-    for result in [r for r in results if r['success']]:
+    analyses_out = []
+    for result in results:
+        if not result['success']:
+            analyses_out.append({
+                'name': result['name'],
+                'category': result['category'],
+                'success': False,
+                'savings': None,
+                'report_file': result.get('report_file')
+            })
+            continue
+
+        successful.append(result)
         category = result['category']
-        if category not in categories:
-            categories[category] = {
+        category_data = categories.get(category)
+        if category_data is None:
+            category_data = categories[category] = {
                 'monthly': 0,
                 'yearly': 0,
                 'items': []
             }
         savings = result['savings']
-        categories[category]['monthly'] += savings['monthly_savings'] or 0
-        categories[category]['yearly'] += savings['yearly_savings'] or 0
-        categories[category]['items'].append(result)
+        monthly_savings = savings['monthly_savings']
+        yearly_savings = savings['yearly_savings']
+        category_data['monthly'] += monthly_savings or 0
+        category_data['yearly'] += yearly_savings or 0
+        category_data['items'].append(result)
+
+        analyses_out.append({
+            'name': result['name'],
+            'category': category,
+            'success': True,
+            'savings': {
+                'monthly': monthly_savings,
+                'yearly': yearly_savings,
+                'current_monthly': savings['current_monthly_cost'],
+                'current_yearly': savings['current_yearly_cost']
+            },
+            'report_file': result.get('report_file')
+        })
 
     # Get top opportunities
     top_opportunities = sorted(
-        [r for r in results if r['success'] and r['savings']['yearly_savings']],
+        [r for r in successful if r['savings']['yearly_savings']],
         key=lambda x: x['savings']['yearly_savings'] or 0,
         reverse=True
     )[:5]
@@ -42,449 +552,7 @@ def generate_html_report(results: List[Dict], reports_path: Path, total_monthly:
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>AWS Cost Analysis Report Card</title>
     <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
-    <style>
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, Cantarell, sans-serif;
-            background: #f5f7fa;
-            padding: 20px;
-            color: #2c3e50;
-        }}
-
-        .container {{
-            max-width: 1200px;
-            margin: 0 auto;
-            background: white;
-            border-radius: 8px;
-            box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-            overflow: hidden;
-        }}
-
-        .header {{
-            background: #2c5aa0;
-            color: white;
-            padding: 40px;
-            text-align: center;
-        }}
-
-        .header h1 {{
-            font-size: 2.5em;
-            margin-bottom: 10px;
-            font-weight: 700;
-        }}
-
-        .header .subtitle {{
-            font-size: 1.1em;
-            opacity: 0.9;
-        }}
-
-        .header .date {{
-            margin-top: 15px;
-            font-size: 0.95em;
-            opacity: 0.8;
-        }}
-
-        .summary {{
-            background: #34495e;
-            color: white;
-            padding: 40px;
-            text-align: center;
-        }}
-
-        .summary-grid {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-            gap: 30px;
-            margin-top: 30px;
-        }}
-
-        .summary-card {{
-            background: rgba(255, 255, 255, 0.15);
-            padding: 25px;
-            border-radius: 8px;
-            border: 1px solid rgba(255, 255, 255, 0.2);
-        }}
-
-        .summary-card .label {{
-            font-size: 0.9em;
-            opacity: 0.9;
-            margin-bottom: 10px;
-        }}
-
-        .summary-card .value {{
-            font-size: 2.5em;
-            font-weight: 700;
-            line-height: 1;
-        }}
-
-        .summary-card .subvalue {{
-            font-size: 0.85em;
-            margin-top: 8px;
-            opacity: 0.85;
-        }}
-
-        .content {{
-            padding: 40px;
-        }}
-
-        .section {{
-            margin-bottom: 40px;
-        }}
-
-        .section-title {{
-            font-size: 1.8em;
-            font-weight: 700;
-            margin-bottom: 20px;
-            color: #2c5aa0;
-            border-bottom: 3px solid #2c5aa0;
-            padding-bottom: 10px;
-        }}
-
-        .category {{
-            margin-bottom: 30px;
-            border: 1px solid #dce3e8;
-            border-radius: 8px;
-            overflow: hidden;
-        }}
-
-        .category-header {{
-            background: #3b6ea5;
-            color: white;
-            padding: 20px;
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-        }}
-
-        .category-header h3 {{
-            font-size: 1.4em;
-            font-weight: 600;
-        }}
-
-        .category-header .total {{
-            font-size: 1.2em;
-            font-weight: 700;
-        }}
-
-        .category-items {{
-            padding: 0;
-        }}
-
-        .item {{
-            padding: 20px;
-            border-bottom: 1px solid #e0e0e0;
-            display: grid;
-            grid-template-columns: auto 1fr auto;
-            gap: 20px;
-            align-items: center;
-            transition: background 0.2s;
-        }}
-
-        .item:hover {{
-            background: #f8f9fa;
-        }}
-
-        .item:last-child {{
-            border-bottom: none;
-        }}
-
-        .item .status {{
-            width: 40px;
-            height: 40px;
-            border-radius: 50%;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-size: 1.1em;
-        }}
-
-        .item .status.optimized {{
-            background: #27ae60;
-            color: white;
-        }}
-
-        .item .status.opportunity {{
-            background: #e67e22;
-            color: white;
-        }}
-
-        .item .info {{
-            flex: 1;
-        }}
-
-        .item .name {{
-            font-size: 1.1em;
-            font-weight: 600;
-            margin-bottom: 5px;
-        }}
-
-        .item .description {{
-            font-size: 0.9em;
-            color: #666;
-        }}
-
-        .item .savings {{
-            text-align: right;
-        }}
-
-        .item .savings .monthly {{
-            font-size: 0.9em;
-            color: #666;
-            margin-bottom: 5px;
-        }}
-
-        .item .savings .yearly {{
-            font-size: 1.4em;
-            font-weight: 700;
-            color: #27ae60;
-        }}
-
-        .opportunities {{
-            background: #fef5e7;
-            border: 2px solid #e67e22;
-            border-radius: 8px;
-            padding: 30px;
-        }}
-
-        .opportunity-list {{
-            list-style: none;
-            counter-reset: opportunity-counter;
-        }}
-
-        .opportunity-item {{
-            counter-increment: opportunity-counter;
-            padding: 20px;
-            margin-bottom: 15px;
-            background: white;
-            border-radius: 8px;
-            box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-            display: grid;
-            grid-template-columns: auto 1fr auto;
-            gap: 20px;
-            align-items: center;
-        }}
-
-        .opportunity-item:before {{
-            content: counter(opportunity-counter);
-            background: #e67e22;
-            color: white;
-            width: 40px;
-            height: 40px;
-            border-radius: 50%;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-weight: 700;
-            font-size: 1.2em;
-        }}
-
-        .opportunity-info {{
-            flex: 1;
-        }}
-
-        .opportunity-name {{
-            font-size: 1.1em;
-            font-weight: 600;
-            margin-bottom: 5px;
-            color: #2c3e50;
-        }}
-
-        .opportunity-details {{
-            font-size: 0.9em;
-            color: #7f8c8d;
-        }}
-
-        .opportunity-savings {{
-            font-size: 1.5em;
-            font-weight: 700;
-            color: #27ae60;
-            text-align: right;
-        }}
-
-        .footer {{
-            background: #f8f9fa;
-            padding: 30px;
-            text-align: center;
-            color: #666;
-            font-size: 0.9em;
-        }}
-
-        .footer .warning {{
-            background: #fef5e7;
-            border: 1px solid #e67e22;
-            border-radius: 8px;
-            padding: 15px;
-            margin-top: 20px;
-            color: #7d6608;
-        }}
-
-        .progress-bar {{
-            background: #e0e0e0;
-            border-radius: 10px;
-            height: 20px;
-            overflow: hidden;
-            margin-top: 10px;
-        }}
-
-        .progress-fill {{
-            background: #27ae60;
-            height: 100%;
-            transition: width 0.5s;
-        }}
-
-        @media print {{
-            @page {{
-                margin: 0.75in;
-                size: letter portrait;
-            }}
-
-            body {{
-                background: white !important;
-                padding: 0;
-                color: #000 !important;
-            }}
-
-            .container {{
-                max-width: 100%;
-                box-shadow: none !important;
-                border-radius: 0;
-            }}
-
-            .header {{
-                background: #2c5aa0 !important;
-                -webkit-print-color-adjust: exact;
-                print-color-adjust: exact;
-                color: white !important;
-                page-break-after: avoid;
-                padding: 20px !important;
-            }}
-
-            .summary {{
-                background: #34495e !important;
-                -webkit-print-color-adjust: exact;
-                print-color-adjust: exact;
-                color: white !important;
-                page-break-after: avoid;
-                page-break-inside: avoid;
-                padding: 20px !important;
-            }}
-
-            .summary-grid {{
-                gap: 15px !important;
-            }}
-
-            .summary-card {{
-                background: rgba(255, 255, 255, 0.15) !important;
-                -webkit-print-color-adjust: exact;
-                print-color-adjust: exact;
-                page-break-inside: avoid;
-            }}
-
-            .content {{
-                padding: 20px 0 !important;
-            }}
-
-            .section {{
-                page-break-inside: avoid;
-                margin-bottom: 30px !important;
-            }}
-
-            .section-title {{
-                color: #2c5aa0 !important;
-                -webkit-print-color-adjust: exact;
-                print-color-adjust: exact;
-                page-break-after: avoid;
-            }}
-
-            .category {{
-                page-break-inside: avoid;
-                border: 1px solid #dce3e8 !important;
-            }}
-
-            .category-header {{
-                background: #3b6ea5 !important;
-                -webkit-print-color-adjust: exact;
-                print-color-adjust: exact;
-                color: white !important;
-                page-break-after: avoid;
-            }}
-
-            .item {{
-                page-break-inside: avoid;
-            }}
-
-            .item:hover {{
-                background: transparent !important;
-            }}
-
-            .item .status.optimized {{
-                background: #27ae60 !important;
-                -webkit-print-color-adjust: exact;
-                print-color-adjust: exact;
-                color: white !important;
-            }}
-
-            .item .status.opportunity {{
-                background: #e67e22 !important;
-                -webkit-print-color-adjust: exact;
-                print-color-adjust: exact;
-                color: white !important;
-            }}
-
-            .item .savings .yearly {{
-                color: #27ae60 !important;
-                -webkit-print-color-adjust: exact;
-                print-color-adjust: exact;
-            }}
-
-            .opportunities {{
-                background: #fef5e7 !important;
-                border: 2px solid #e67e22 !important;
-                -webkit-print-color-adjust: exact;
-                print-color-adjust: exact;
-                page-break-inside: avoid;
-            }}
-
-            .opportunity-item {{
-                page-break-inside: avoid;
-            }}
-
-            .opportunity-item:before {{
-                background: #e67e22 !important;
-                -webkit-print-color-adjust: exact;
-                print-color-adjust: exact;
-                color: white !important;
-            }}
-
-            .opportunity-savings {{
-                color: #27ae60 !important;
-                -webkit-print-color-adjust: exact;
-                print-color-adjust: exact;
-            }}
-
-            .footer {{
-                page-break-before: avoid;
-                page-break-inside: avoid;
-            }}
-
-            .footer .warning {{
-                background: #fef5e7 !important;
-                border: 1px solid #e67e22 !important;
-                -webkit-print-color-adjust: exact;
-                print-color-adjust: exact;
-            }}
-
-            /* Hide unnecessary elements in print */
-            .no-print {{
-                display: none !important;
-            }}
-        }}
-    </style>
+    <style>{_CSS_MIN}</style>
 </head>
 <body>
     <div class="container">
@@ -514,7 +582,7 @@ def generate_html_report(results: List[Dict], reports_path: Path, total_monthly:
                 </div>
                 <div class="summary-card">
                     <div class="label">Analyses Run</div>
-                    <div class="value">{sum(1 for r in results if r['success'])}</div>
+                    <div class="value">{len(successful)}</div>
                     <div class="subvalue">of {len(results)} total</div>
                 </div>
             </div>
@@ -604,7 +672,7 @@ def generate_html_report(results: List[Dict], reports_path: Path, total_monthly:
                 <ul style="list-style: none; padding-left: 0;">
 """
 
-    for result in [r for r in results if r['success']]:
+    for result in successful:
         html_content += f"""
                     <li style="padding: 10px; margin-bottom: 8px; background: #f8f9fa; border-radius: 6px;">
                         <strong>{result['name']}:</strong> <code>{result['report_file']}</code>
@@ -638,10 +706,8 @@ def generate_html_report(results: List[Dict], reports_path: Path, total_monthly:
 </html>
 """
 
-    # Write HTML file
-    html_file = reports_path / 'index.html'
-    with open(html_file, 'w') as f:
-        f.write(html_content)
+    # Collapse indentation between tags
+    html_content = _WS.sub('><', html_content)
 
     # Also create a JSON data file for potential API use
     json_data = {
@@ -661,25 +727,22 @@ def generate_html_report(results: List[Dict], reports_path: Path, total_monthly:
             }
             for name, data in categories.items()
         },
-        'analyses': [
-            {
-                'name': r['name'],
-                'category': r['category'],
-                'success': r['success'],
-                'savings': {
-                    'monthly': r['savings']['monthly_savings'],
-                    'yearly': r['savings']['yearly_savings'],
-                    'current_monthly': r['savings']['current_monthly_cost'],
-                    'current_yearly': r['savings']['current_yearly_cost']
-                } if r['success'] else None,
-                'report_file': r.get('report_file')
-            }
-            for r in results
-        ]
+        'analyses': analyses_out
     }
 
+    json_content = json.dumps(json_data, separators=(',', ':'))
+
+    # Write HTML and JSON files concurrently
+    html_file = reports_path / 'index.html'
     json_file = reports_path / 'report_data.json'
-    with open(json_file, 'w') as f:
-        json.dump(json_data, f, indent=2)
+    json_gz_file = reports_path / 'report_data.json.gz'
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [
+            executor.submit(_write_file, html_file, html_content),
+            executor.submit(_write_file, json_file, json_content),
+            executor.submit(_write_gzip, json_gz_file, json_content)
+        ]
+        for future in futures:
+            future.result()
 
     return html_file, json_file
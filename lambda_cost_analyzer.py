@@ -5,173 +5,167 @@ Analyzes Lambda function usage, memory allocation, and potential cost savings.
 READ-ONLY - Makes no changes to AWS resources.
 """
 
-import subprocess
-import json
 import sys
 from typing import Dict, List, Tuple
-from decimal import Decimal
 from datetime import datetime, timedelta
+from aws_cli import get_metric_data, metric_window, run_list_command
 
 # AWS Lambda Pricing (USD) - us-east-1 region
-PRICE_PER_GB_SECOND = Decimal('0.0000166667')  # Per GB-second
-PRICE_PER_MILLION_REQUESTS = Decimal('0.20')  # Per 1M requests
+PRICE_PER_GB_SECOND = 0.0000166667  # Per GB-second
+PRICE_PER_MILLION_REQUESTS = 0.20  # Per 1M requests
 FREE_TIER_GB_SECONDS = 400000  # Per month
 FREE_TIER_REQUESTS = 1000000  # Per month
 
+# CloudWatch metrics collected per function: (metric name, statistic, result key, type)
+LAMBDA_METRICS = [
+    ('Invocations', 'Sum', 'invocations', int),
+    ('Duration', 'Average', 'duration_avg', float),
+    ('Errors', 'Sum', 'errors', int),
+]
 
-def run_command(cmd: List[str]) -> Tuple[bool, str]:
-    """Run a shell command and return success status and output."""
-    try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        return True, result.stdout
-    except subprocess.CalledProcessError as e:
-        return False, e.stderr
-    except FileNotFoundError:
-        return False, "AWS CLI not found. Please install it first."
+# Functions not modified for this many days are probed for invocations first
+COLD_FUNCTION_DAYS = 90
+
+# Metric window, computed once
+_START_30D, _END = metric_window(30)
 
 
 def get_all_lambda_functions() -> List[Dict]:
     """Get list of all Lambda functions."""
     print("Fetching all Lambda functions...")
-    success, output = run_command([
+    # Project only the fields used here so the CLI output to parse stays small
+    success, functions, error = run_list_command([
         'aws', 'lambda', 'list-functions',
+        '--query', '{Functions: Functions[].{FunctionName: FunctionName, MemorySize: MemorySize, '
+                   'Runtime: Runtime, Timeout: Timeout, CodeSize: CodeSize, LastModified: LastModified}}',
         '--output', 'json'
-    ])
+    ], 'Functions')
 
     if not success:
-        print(f"Error getting Lambda functions: {output}")
+        print(f"Error getting Lambda functions: {error}")
         return []
 
-    try:
-        data = json.loads(output) if output.strip() else {}
-        functions = data.get('Functions', [])
-
-        function_list = []
-        for func in functions:
-            function_list.append({
-                'name': func.get('FunctionName', ''),
-                'memory_mb': func.get('MemorySize', 128),
-                'runtime': func.get('Runtime', 'unknown'),
-                'timeout': func.get('Timeout', 3),
-                'code_size': func.get('CodeSize', 0),
-                'last_modified': func.get('LastModified', '')
-            })
+    function_list = []
+    for func in functions:
+        function_list.append({
+            'name': func.get('FunctionName') or '',
+            'memory_mb': func.get('MemorySize') or 128,
+            'runtime': func.get('Runtime') or 'unknown',
+            'timeout': func.get('Timeout') or 3,
+            'code_size': func.get('CodeSize') or 0,
+            'last_modified': func.get('LastModified') or ''
+        })
 
-        return function_list
+    return function_list
 
-    except json.JSONDecodeError:
-        print("Error parsing Lambda functions data")
-        return []
 
+def is_modified_before(func: Dict, cutoff: datetime) -> bool:
+    """Check whether a function was last modified before the cutoff."""
+    try:
+        return datetime.strptime(func['last_modified'], '%Y-%m-%dT%H:%M:%S.%f%z') < cutoff
+    except ValueError:
+        return False
+
+
+def get_function_metric_values(requests: List[Tuple[Dict, List[Tuple]]]) -> Dict[str, List[float]]:
+    """Query metrics for individual functions, keyed by '<key>:<function name>'."""
+    queries = []
+    for i, (func, metric_specs) in enumerate(requests):
+        for metric_name, stat, key, _ in metric_specs:
+            queries.append({
+                'Id': f'm{i}_{key}',
+                'MetricStat': {
+                    'Metric': {
+                        'Namespace': 'AWS/Lambda',
+                        'MetricName': metric_name,
+                        'Dimensions': [{'Name': 'FunctionName', 'Value': func['name']}]
+                    },
+                    'Period': 2592000,  # 30 days
+                    'Stat': stat
+                }
+            })
 
-def get_function_metrics(function_name: str) -> Dict:
-    """Get CloudWatch metrics for a Lambda function (last 30 days)."""
-    end_time = datetime.utcnow()
-    start_time = end_time - timedelta(days=30)
+    values = get_metric_data(queries, _START_30D, _END)
 
-    metrics = {
-        'invocations': 0,
-        'duration_avg': 0,
-        'errors': 0
+    return {
+        f"{key}:{func['name']}": values.get(f'm{i}_{key}', [])
+        for i, (func, metric_specs) in enumerate(requests)
+        for _, _, key, _ in metric_specs
     }
 
-    # Get invocations
-    success, output = run_command([
-        'aws', 'cloudwatch', 'get-metric-statistics',
-        '--namespace', 'AWS/Lambda',
-        '--metric-name', 'Invocations',
-        '--dimensions', f'Name=FunctionName,Value={function_name}',
-        '--start-time', start_time.isoformat(),
-        '--end-time', end_time.isoformat(),
-        '--period', '2592000',  # 30 days
-        '--statistics', 'Sum',
-        '--output', 'json'
-    ])
-
-    if success:
-        try:
-            data = json.loads(output)
-            datapoints = data.get('Datapoints', [])
-            if datapoints:
-                metrics['invocations'] = int(datapoints[0].get('Sum', 0))
-        except:
-            pass
-
-    # Get average duration
-    success, output = run_command([
-        'aws', 'cloudwatch', 'get-metric-statistics',
-        '--namespace', 'AWS/Lambda',
-        '--metric-name', 'Duration',
-        '--dimensions', f'Name=FunctionName,Value={function_name}',
-        '--start-time', start_time.isoformat(),
-        '--end-time', end_time.isoformat(),
-        '--period', '2592000',
-        '--statistics', 'Average',
-        '--output', 'json'
-    ])
-
-    if success:
-        try:
-            data = json.loads(output)
-            datapoints = data.get('Datapoints', [])
-            if datapoints:
-                metrics['duration_avg'] = float(datapoints[0].get('Average', 0))
-        except:
-            pass
-
-    # Get errors
-    success, output = run_command([
-        'aws', 'cloudwatch', 'get-metric-statistics',
-        '--namespace', 'AWS/Lambda',
-        '--metric-name', 'Errors',
-        '--dimensions', f'Name=FunctionName,Value={function_name}',
-        '--start-time', start_time.isoformat(),
-        '--end-time', end_time.isoformat(),
-        '--period', '2592000',
-        '--statistics', 'Sum',
-        '--output', 'json'
-    ])
 
-    if success:
-        try:
-            data = json.loads(output)
-            datapoints = data.get('Datapoints', [])
-            if datapoints:
-                metrics['errors'] = int(datapoints[0].get('Sum', 0))
-        except:
-            pass
+def get_all_function_metrics(functions: List[Dict]) -> Dict[str, Dict]:
+    """Get CloudWatch metrics for all Lambda functions (last 30 days), keyed by function name."""
+    # One SEARCH expression per metric returns the series of every function at once,
+    # labelled with the function name
+    search_queries = [
+        {
+            'Id': key,
+            'Expression': (
+                f"SEARCH('{{AWS/Lambda,FunctionName}} MetricName=\"{metric_name}\"', "
+                f"'{stat}', 2592000)"
+            ),
+            'Label': "${PROP('Dim.FunctionName')}"
+        }
+        for metric_name, stat, key, _ in LAMBDA_METRICS
+    ]
+    search_values = get_metric_data(search_queries, _START_30D, _END)
+
+    # SEARCH only matches metrics with data in the last two weeks (and caps the
+    # number of series), so query any function it did not return individually
+    remaining = [func for func in functions if f"invocations:{func['name']}" not in search_values]
+
+    # Functions untouched for a long time are likely idle: probe Invocations only,
+    # and fetch Duration/Errors just for the ones that turn out to have run
+    cutoff = _END - timedelta(days=COLD_FUNCTION_DAYS)
+    requests = [
+        (func, LAMBDA_METRICS[:1] if is_modified_before(func, cutoff) else LAMBDA_METRICS)
+        for func in remaining
+    ]
+    values = get_function_metric_values(requests)
+
+    active_cold = [
+        (func, LAMBDA_METRICS[1:])
+        for func, specs in requests
+        if len(specs) == 1 and sum(values[f"invocations:{func['name']}"]) > 0
+    ]
+    values.update(get_function_metric_values(active_cold))
+    values.update(search_values)
+
+    all_metrics = {}
+    for func in functions:
+        metrics = {}
+        for _, stat, key, caster in LAMBDA_METRICS:
+            series = values.get(f"{key}:{func['name']}", [])
+            if stat == 'Average':
+                metrics[key] = caster(sum(series) / len(series)) if series else caster(0)
+            else:
+                metrics[key] = caster(sum(series))
+        all_metrics[func['name']] = metrics
 
-    return metrics
+    return all_metrics
 
 
-def calculate_lambda_cost(memory_mb: int, duration_ms: float, invocations: int) -> Decimal:
+def calculate_lambda_cost(memory_mb: int, duration_ms: float, invocations: int) -> float:
     """Calculate Lambda cost based on memory, duration, and invocations."""
-    memory_gb = Decimal(memory_mb) / Decimal('1024')
-    duration_seconds = Decimal(duration_ms) / Decimal('1000')
-
     # GB-seconds
-    gb_seconds = memory_gb * duration_seconds * Decimal(invocations)
+    gb_seconds = memory_mb / 1024.0 * duration_ms / 1000.0 * invocations
 
     # Apply free tier
-    billable_gb_seconds = max(Decimal('0'), gb_seconds - Decimal(FREE_TIER_GB_SECONDS))
+    billable_gb_seconds = max(0.0, gb_seconds - FREE_TIER_GB_SECONDS)
 
     # Compute cost
     compute_cost = billable_gb_seconds * PRICE_PER_GB_SECOND
 
     # Request cost
     billable_requests = max(0, invocations - FREE_TIER_REQUESTS)
-    request_cost = Decimal(billable_requests) / Decimal('1000000') * PRICE_PER_MILLION_REQUESTS
+    request_cost = billable_requests / 1000000.0 * PRICE_PER_MILLION_REQUESTS
 
     return compute_cost + request_cost
 
 
-def format_currency(amount: Decimal) -> str:
-    """Format decimal as currency."""
+def format_currency(amount: float) -> str:
+    """Format amount as currency."""
     return f"${amount:.2f}"
 
 
@@ -206,14 +200,17 @@ def main():
     print()
 
     # Analyze each function
-    function_analysis = []
-    total_monthly_cost = Decimal('0')
+    total_monthly_cost = 0.0
     unused_functions = []
     over_provisioned = []
 
+    print("Fetching CloudWatch metrics for all functions...")
+    all_metrics = get_all_function_metrics(functions)
+    print()
+
+    progress_lines = []
     for func in functions:
-        print(f"Analyzing {func['name']}...", end='', flush=True)
-        metrics = get_function_metrics(func['name'])
+        metrics = all_metrics[func['name']]
 
         # Calculate monthly cost (based on 30-day data)
         if metrics['invocations'] > 0:
@@ -223,7 +220,7 @@ def main():
                 metrics['invocations']
             )
         else:
-            monthly_cost = Decimal('0')
+            monthly_cost = 0.0
 
         total_monthly_cost += monthly_cost
 
@@ -242,16 +239,11 @@ def main():
                 'cost': monthly_cost
             })
 
-        function_analysis.append({
-            'function': func,
-            'metrics': metrics,
-            'cost': monthly_cost,
-            'unused': is_unused,
-            'over_provisioned': is_over_provisioned
-        })
-
-        print(f" {metrics['invocations']} invocations, {format_currency(monthly_cost)}/mo")
+        progress_lines.append(
+            f"Analyzing {func['name']}... {metrics['invocations']} invocations, {format_currency(monthly_cost)}/mo"
+        )
 
+    sys.stdout.write('\n'.join(progress_lines) + '\n')
     print()
     print_separator('-')
     print()
@@ -268,7 +260,7 @@ def main():
     print()
 
     # Savings opportunities
-    total_savings = Decimal('0')
+    total_savings = 0.0
 
     if unused_functions:
         print_separator()
@@ -322,7 +314,7 @@ def main():
         print()
 
         # Conservative savings estimate (5-10% from optimization)
-        estimated_savings = total_monthly_cost * Decimal('0.05')
+        estimated_savings = total_monthly_cost * 0.05
         total_savings = estimated_savings
 
         print(f"Monthly Savings: {format_currency(estimated_savings)}")
@@ -1,114 +1,133 @@
 #!/usr/bin/env python3
 """
 Load Balancer Cost Analyzer
-Analyzes ELB (Classic), ALB, and NLB usage to identify unused or underutilized load balancers.
+Analyzes ELB (Classic), ALB, NLB, and GWLB usage to identify unused or underutilized load balancers.
 READ-ONLY - Makes no changes to AWS resources.
 """
 
-import subprocess
 import json
 import sys
-from typing import Dict, List, Tuple
-from decimal import Decimal
-from datetime import datetime, timedelta
+from typing import Dict, List
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from aws_cli import get_metric_data, metric_window, run_command, run_list_command
 
 # AWS Load Balancer Pricing (USD) - us-east-1 region
 # Application Load Balancer (ALB)
-ALB_HOURLY_RATE = Decimal('0.0225')  # Per hour
-ALB_LCU_HOURLY = Decimal('0.008')  # Per LCU-hour
+ALB_HOURLY_RATE = 0.0225  # Per hour
+ALB_LCU_HOURLY = 0.008  # Per LCU-hour
 
 # Network Load Balancer (NLB)
-NLB_HOURLY_RATE = Decimal('0.0225')  # Per hour
-NLB_LCU_HOURLY = Decimal('0.006')  # Per LCU-hour
+NLB_HOURLY_RATE = 0.0225  # Per hour
+NLB_LCU_HOURLY = 0.006  # Per LCU-hour
+
+# Gateway Load Balancer (GWLB)
+GWLB_HOURLY_RATE = 0.0125  # Per hour
+GWLB_LCU_HOURLY = 0.004  # Per GLCU-hour
 
 # Classic Load Balancer (ELB)
-ELB_HOURLY_RATE = Decimal('0.025')  # Per hour
-ELB_DATA_GB = Decimal('0.008')  # Per GB processed
+ELB_HOURLY_RATE = 0.025  # Per hour
+ELB_DATA_GB = 0.008  # Per GB processed
 
+# Fixed monthly cost per load balancer type (730 hours; ALB/NLB/GWLB include 1 LCU)
+HOURS_PER_MONTH = 730
+_LB_BASE = {
+    'classic': ELB_HOURLY_RATE * HOURS_PER_MONTH,
+    'application': (ALB_HOURLY_RATE + ALB_LCU_HOURLY) * HOURS_PER_MONTH,
+    'network': (NLB_HOURLY_RATE + NLB_LCU_HOURLY) * HOURS_PER_MONTH,
+    'gateway': (GWLB_HOURLY_RATE + GWLB_LCU_HOURLY) * HOURS_PER_MONTH,
+}
 
-def run_command(cmd: List[str]) -> Tuple[bool, str]:
-    """Run a shell command and return success status and output."""
-    try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        return True, result.stdout
-    except subprocess.CalledProcessError as e:
-        return False, e.stderr
-    except FileNotFoundError:
-        return False, "AWS CLI not found. Please install it first."
+# CloudWatch namespace per load balancer type
+_LB_NAMESPACES = {
+    'classic': 'AWS/ELB',
+    'application': 'AWS/ApplicationELB',
+    'network': 'AWS/NetworkELB',
+    'gateway': 'AWS/GatewayELB',
+}
+
+# Metric window, computed once
+_START_7D, _END = metric_window(7)
+
+# Concurrent AWS CLI calls for network-bound fan-out (each call is a separate process)
+MAX_WORKERS = 16
 
 
 def get_classic_load_balancers() -> List[Dict]:
     """Get list of all Classic Load Balancers (ELB)."""
-    success, output = run_command([
+    success, lbs, _ = run_list_command([
         'aws', 'elb', 'describe-load-balancers',
         '--output', 'json'
-    ])
+    ], 'LoadBalancerDescriptions')
 
     if not success:
         return []
 
-    try:
-        data = json.loads(output) if output.strip() else {}
-        lbs = data.get('LoadBalancerDescriptions', [])
-
-        lb_list = []
-        for lb in lbs:
-            lb_list.append({
-                'name': lb.get('LoadBalancerName', ''),
-                'dns': lb.get('DNSName', ''),
-                'type': 'classic',
-                'created': lb.get('CreatedTime', ''),
-                'instances': lb.get('Instances', []),
-                'scheme': lb.get('Scheme', 'internet-facing')
-            })
-
-        return lb_list
+    lb_list = []
+    for lb in lbs:
+        lb_list.append({
+            'name': lb.get('LoadBalancerName', ''),
+            'dns': lb.get('DNSName', ''),
+            'type': 'classic',
+            'cw_dim': lb.get('LoadBalancerName', ''),
+            'created': lb.get('CreatedTime', ''),
+            'instances': lb.get('Instances', []),
+            'scheme': lb.get('Scheme', 'internet-facing')
+        })
 
-    except json.JSONDecodeError:
-        return []
+    return lb_list
 
 
 def get_application_and_network_load_balancers() -> List[Dict]:
     """Get list of all Application and Network Load Balancers."""
-    success, output = run_command([
+    success, lbs, _ = run_list_command([
         'aws', 'elbv2', 'describe-load-balancers',
         '--output', 'json'
-    ])
+    ], 'LoadBalancers')
 
     if not success:
         return []
 
-    try:
-        data = json.loads(output) if output.strip() else {}
-        lbs = data.get('LoadBalancers', [])
-
-        lb_list = []
-        for lb in lbs:
-            lb_type = lb.get('Type', 'application')
-            lb_list.append({
-                'name': lb.get('LoadBalancerName', ''),
-                'arn': lb.get('LoadBalancerArn', ''),
-                'dns': lb.get('DNSName', ''),
-                'type': lb_type,
-                'created': lb.get('CreatedTime', ''),
-                'state': lb.get('State', {}).get('Code', ''),
-                'scheme': lb.get('Scheme', 'internet-facing')
-            })
+    lb_list = []
+    for lb in lbs:
+        lb_type = lb.get('Type', 'application')
+        lb_arn = lb.get('LoadBalancerArn', '')
+        lb_list.append({
+            'name': lb.get('LoadBalancerName', ''),
+            'arn': lb_arn,
+            # CloudWatch 'LoadBalancer' dimension value, e.g. app/<name>/<id>
+            'cw_dim': lb_arn.split(':loadbalancer/', 1)[-1],
+            'dns': lb.get('DNSName', ''),
+            'type': lb_type,
+            'created': lb.get('CreatedTime', ''),
+            'state': lb.get('State', {}).get('Code', ''),
+            'scheme': lb.get('Scheme', 'internet-facing')
+        })
+
+    return lb_list
+
 
-        return lb_list
+def get_target_group_health(tg_arn: str) -> List[Dict]:
+    """Get target health descriptions for a target group."""
+    success, output = run_command([
+        'aws', 'elbv2', 'describe-target-health',
+        '--target-group-arn', tg_arn,
+        '--output', 'json'
+    ])
+
+    if not success:
+        print(f"  Warning: Could not fetch target health for {tg_arn}: {output.strip()}")
+        return []
 
-    except json.JSONDecodeError:
+    try:
+        return json.loads(output).get('TargetHealthDescriptions', [])
+    except json.JSONDecodeError as e:
+        print(f"  Warning: Error parsing target health for {tg_arn}: {e}")
         return []
 
 
-def get_target_health(lb_arn: str) -> int:
-    """Get number of healthy targets for ALB/NLB."""
-    # First get target groups
+def get_target_groups(lb_arn: str) -> List[str]:
+    """Get target group ARNs for an ALB/NLB."""
     success, output = run_command([
         'aws', 'elbv2', 'describe-target-groups',
         '--load-balancer-arn', lb_arn,
@@ -116,104 +135,117 @@ def get_target_health(lb_arn: str) -> int:
     ])
 
     if not success:
-        return 0
+        print(f"  Warning: Could not fetch target groups for {lb_arn}: {output.strip()}")
+        return []
 
     try:
-        data = json.loads(output)
-        target_groups = data.get('TargetGroups', [])
-
-        total_healthy = 0
-        for tg in target_groups:
-            tg_arn = tg.get('TargetGroupArn', '')
-
-            # Get health of targets
-            success2, output2 = run_command([
-                'aws', 'elbv2', 'describe-target-health',
-                '--target-group-arn', tg_arn,
-                '--output', 'json'
-            ])
-
-            if success2:
-                health_data = json.loads(output2)
-                descriptions = health_data.get('TargetHealthDescriptions', [])
-                for desc in descriptions:
-                    if desc.get('TargetHealth', {}).get('State') == 'healthy':
-                        total_healthy += 1
-
-        return total_healthy
-
-    except:
-        return 0
-
-
-def get_lb_metrics(lb_name: str, lb_type: str) -> Dict:
-    """Get CloudWatch metrics for a load balancer (last 7 days)."""
-    end_time = datetime.utcnow()
-    start_time = end_time - timedelta(days=7)
-
-    metrics = {
-        'request_count': 0,
-        'active_connections': 0,
-        'processed_bytes': 0
+        target_groups = json.loads(output).get('TargetGroups', [])
+    except json.JSONDecodeError as e:
+        print(f"  Warning: Error parsing target groups for {lb_arn}: {e}")
+        return []
+
+    return [tg.get('TargetGroupArn', '') for tg in target_groups]
+
+
+def count_all_targets(lbs: List[Dict], executor: ThreadPoolExecutor) -> List[int]:
+    """Count healthy targets (ALB/NLB/GWLB) or registered instances (Classic), in the same order as lbs."""
+    # Target group listings and health checks all run on the caller's pool,
+    # which bounds the number of concurrent CLI processes
+    tg_futures = {
+        i: executor.submit(get_target_groups, lb['arn'])
+        for i, lb in enumerate(lbs)
+        if lb['type'] != 'classic'
+    }
+    health_futures = {
+        i: [executor.submit(get_target_group_health, tg_arn) for tg_arn in future.result()]
+        for i, future in tg_futures.items()
     }
 
-    namespace = 'AWS/ELB' if lb_type == 'classic' else 'AWS/ApplicationELB' if lb_type == 'application' else 'AWS/NetworkELB'
-    dimension_name = 'LoadBalancerName' if lb_type == 'classic' else 'LoadBalancer'
+    targets = []
+    for i, lb in enumerate(lbs):
+        if i in health_futures:
+            targets.append(sum(
+                1
+                for future in health_futures[i]
+                for desc in future.result()
+                if desc.get('TargetHealth', {}).get('State') == 'healthy'
+            ))
+        else:
+            targets.append(len(lb.get('instances', [])))
+
+    return targets
+
+
+def get_all_lb_metrics(lbs: List[Dict]) -> List[Dict]:
+    """Get CloudWatch metrics for all load balancers (last 7 days), in the same order as lbs."""
+    queries = []
+    for i, lb in enumerate(lbs):
+        lb_type = lb['type']
+        # Types without their own namespace are looked up as NLBs, which they are priced as
+        namespace = _LB_NAMESPACES.get(lb_type, _LB_NAMESPACES['network'])
+        dimension_name = 'LoadBalancerName' if lb_type == 'classic' else 'LoadBalancer'
+        metric_name = 'RequestCount' if lb_type in ['classic', 'application'] else 'ProcessedBytes'
+        queries.append({
+            'Id': f'm{i}',
+            'MetricStat': {
+                'Metric': {
+                    'Namespace': namespace,
+                    'MetricName': metric_name,
+                    'Dimensions': [{'Name': dimension_name, 'Value': lb['cw_dim']}]
+                },
+                'Period': 604800,  # 7 days
+                'Stat': 'Sum'
+            }
+        })
 
-    # For ALB/NLB, need to extract the proper dimension value from ARN
-    dimension_value = lb_name
+        # Classic ELBs are also billed per GB processed
+        if lb_type == 'classic':
+            queries.append({
+                'Id': f'b{i}',
+                'MetricStat': {
+                    'Metric': {
+                        'Namespace': namespace,
+                        'MetricName': 'EstimatedProcessedBytes',
+                        'Dimensions': [{'Name': dimension_name, 'Value': lb['cw_dim']}]
+                    },
+                    'Period': 604800,  # 7 days
+                    'Stat': 'Sum'
+                }
+            })
 
-    # Get RequestCount
-    metric_name = 'RequestCount' if lb_type in ['classic', 'application'] else 'ProcessedBytes'
-    success, output = run_command([
-        'aws', 'cloudwatch', 'get-metric-statistics',
-        '--namespace', namespace,
-        '--metric-name', metric_name,
-        '--dimensions', f'Name={dimension_name},Value={dimension_value}',
-        '--start-time', start_time.isoformat(),
-        '--end-time', end_time.isoformat(),
-        '--period', '604800',  # 7 days
-        '--statistics', 'Sum',
-        '--output', 'json'
-    ])
+    values = get_metric_data(queries, _START_7D, _END)
+
+    all_metrics = []
+    for i, lb in enumerate(lbs):
+        metrics = {
+            'request_count': 0,
+            'active_connections': 0,
+            'processed_bytes': 0
+        }
 
-    if success:
-        try:
-            data = json.loads(output)
-            datapoints = data.get('Datapoints', [])
-            if datapoints:
-                if lb_type in ['classic', 'application']:
-                    metrics['request_count'] = int(datapoints[0].get('Sum', 0))
-                else:
-                    metrics['processed_bytes'] = int(datapoints[0].get('Sum', 0))
-        except:
-            pass
+        total = int(sum(values.get(f'm{i}', [])))
+        if lb['type'] in ['classic', 'application']:
+            metrics['request_count'] = total
+        else:
+            metrics['processed_bytes'] = total
 
-    return metrics
+        if lb['type'] == 'classic':
+            metrics['processed_bytes'] = int(sum(values.get(f'b{i}', [])))
 
+        all_metrics.append(metrics)
 
-def calculate_lb_cost(lb_type: str, data_gb: Decimal = Decimal('0')) -> Decimal:
+    return all_metrics
+
+
+def calculate_lb_cost(lb_type: str, data_gb: float = 0.0) -> float:
     """Calculate load balancer monthly cost."""
-    hours_per_month = Decimal('730')
-
-    if lb_type == 'classic':
-        hourly_cost = ELB_HOURLY_RATE * hours_per_month
-        data_cost = data_gb * ELB_DATA_GB
-        return hourly_cost + data_cost
-    elif lb_type == 'application':
-        # Base cost + minimal LCU cost (1 LCU for low usage)
-        hourly_cost = ALB_HOURLY_RATE * hours_per_month
-        lcu_cost = ALB_LCU_HOURLY * hours_per_month
-        return hourly_cost + lcu_cost
-    else:  # network
-        # Base cost + minimal LCU cost
-        hourly_cost = NLB_HOURLY_RATE * hours_per_month
-        lcu_cost = NLB_LCU_HOURLY * hours_per_month
-        return hourly_cost + lcu_cost
-
-
-def format_currency(amount: Decimal) -> str:
-    """Format decimal as currency."""
+    # Only Classic ELBs are billed per GB processed (callers pass data_gb for them alone);
+    # types without their own rate are priced as NLBs
+    return _LB_BASE.get(lb_type, _LB_BASE['network']) + data_gb * ELB_DATA_GB
+
+
+def format_currency(amount: float) -> str:
+    """Format amount as currency."""
     return f"${amount:.2f}"
 
 
@@ -231,9 +263,12 @@ def main():
 
     print("Fetching all Load Balancers...")
 
-    # Get all load balancers
-    classic_lbs = get_classic_load_balancers()
-    modern_lbs = get_application_and_network_load_balancers()
+    # Get all load balancers (Classic and ALB/NLB are separate APIs, so query both at once)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        classic_future = executor.submit(get_classic_load_balancers)
+        modern_future = executor.submit(get_application_and_network_load_balancers)
+        classic_lbs = classic_future.result()
+        modern_lbs = modern_future.result()
 
     all_lbs = classic_lbs + modern_lbs
 
@@ -248,64 +283,61 @@ def main():
         print_separator()
         sys.exit(0)
 
+    type_counts = Counter(lb['type'] for lb in all_lbs)
     print(f"Found {len(all_lbs)} Load Balancer(s)")
-    print(f"  Classic: {len(classic_lbs)}")
-    print(f"  Application: {len([lb for lb in modern_lbs if lb['type'] == 'application'])}")
-    print(f"  Network: {len([lb for lb in modern_lbs if lb['type'] == 'network'])}")
+    print(f"  Classic: {type_counts['classic']}")
+    print(f"  Application: {type_counts['application']}")
+    print(f"  Network: {type_counts['network']}")
+    print(f"  Gateway: {type_counts['gateway']}")
     print()
     print_separator('-')
     print()
 
     # Analyze each load balancer
-    lb_analysis = []
-    total_monthly_cost = Decimal('0')
+    total_monthly_cost = 0.0
+    unused_savings = 0.0
+    # Findings are stored as indices into all_lbs/monthly_costs
+    monthly_costs = []
     unused_lbs = []
     no_targets_lbs = []
 
-    for lb in all_lbs:
-        print(f"Analyzing {lb['name']} ({lb['type'].upper()})...", end='', flush=True)
-
-        # Get metrics
-        metrics = get_lb_metrics(lb['name'], lb['type'])
-
-        # For ALB/NLB, check targets
-        targets = 0
-        if lb['type'] in ['application', 'network']:
-            targets = get_target_health(lb['arn'])
-        elif lb['type'] == 'classic':
-            targets = len(lb.get('instances', []))
+    print("Fetching CloudWatch metrics and target health for all Load Balancers...")
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        # Target lookups are independent network calls, so overlap them with the metric fetch
+        metrics_future = executor.submit(get_all_lb_metrics, all_lbs)
+        all_targets = count_all_targets(all_lbs, executor)
+        all_metrics = metrics_future.result()
+    print()
 
-        # Calculate cost
-        monthly_cost = calculate_lb_cost(lb['type'])
+    progress_lines = []
+    for i, (lb, metrics, targets) in enumerate(zip(all_lbs, all_metrics, all_targets)):
+        # Calculate cost (data processing is billed for Classic ELBs only)
+        if lb['type'] == 'classic':
+            # Extrapolate 7 days of processed bytes to 30 days, in GB
+            data_gb = metrics['processed_bytes'] / 1073741824 * 30 / 7
+            monthly_cost = calculate_lb_cost(lb['type'], data_gb)
+        else:
+            monthly_cost = calculate_lb_cost(lb['type'])
         total_monthly_cost += monthly_cost
+        monthly_costs.append(monthly_cost)
 
         # Identify issues
         is_unused = (metrics['request_count'] == 0 and metrics['processed_bytes'] == 0)
         has_no_targets = (targets == 0)
 
         if is_unused:
-            unused_lbs.append({
-                'lb': lb,
-                'cost': monthly_cost
-            })
+            unused_savings += monthly_cost
+            unused_lbs.append(i)
 
         if has_no_targets and not is_unused:
-            no_targets_lbs.append({
-                'lb': lb,
-                'cost': monthly_cost
-            })
+            no_targets_lbs.append(i)
 
-        lb_analysis.append({
-            'lb': lb,
-            'metrics': metrics,
-            'cost': monthly_cost,
-            'targets': targets,
-            'unused': is_unused,
-            'no_targets': has_no_targets
-        })
-
-        print(f" {metrics['request_count']} requests, {targets} targets, {format_currency(monthly_cost)}/mo")
+        progress_lines.append(
+            f"Analyzing {lb['name']} ({lb['type'].upper()})... "
+            f"{metrics['request_count']} requests, {targets} targets, {format_currency(monthly_cost)}/mo"
+        )
 
+    sys.stdout.write('\n'.join(progress_lines) + '\n')
     print()
     print_separator('-')
     print()
@@ -322,7 +354,7 @@ def main():
     print()
 
     # Savings opportunities
-    total_savings = Decimal('0')
+    total_savings = 0.0
 
     if unused_lbs:
         print_separator()
@@ -332,11 +364,9 @@ def main():
         print(f"Found {len(unused_lbs)} unused Load Balancer(s)")
         print()
 
-        unused_savings = Decimal('0')
-        for item in unused_lbs:
-            lb = item['lb']
-            cost = item['cost']
-            unused_savings += cost
+        for i in unused_lbs:
+            lb = all_lbs[i]
+            cost = monthly_costs[i]
             print(f"  • {lb['name']} ({lb['type'].upper()})")
             print(f"    DNS: {lb['dns']}")
             print(f"    Monthly Cost: {format_currency(cost)}")
@@ -357,9 +387,9 @@ def main():
         print()
         print(f"Found {len(no_targets_lbs)} Load Balancer(s) with no registered targets")
         print()
-        for item in no_targets_lbs:
-            lb = item['lb']
-            cost = item['cost']
+        for i in no_targets_lbs:
+            lb = all_lbs[i]
+            cost = monthly_costs[i]
             print(f"  • {lb['name']} ({lb['type'].upper()})")
             print(f"    Monthly Cost: {format_currency(cost)}")
             print()
@@ -5,163 +5,193 @@ Analyzes NAT Gateway usage and identifies underutilized or unused gateways.
 READ-ONLY - Makes no changes to AWS resources.
 """
 
-import subprocess
+import argparse
 import json
 import sys
-from typing import Dict, List, Tuple
+import time
+from typing import Dict, List, Optional, Set
 from decimal import Decimal
-from datetime import datetime, timedelta
+from pathlib import Path
+from aws_cli import get_metric_data, metric_window, run_list_command, write_json_atomic
 
 # AWS NAT Gateway Pricing (USD) - us-east-1 region
 NAT_GATEWAY_HOURLY_RATE = Decimal('0.045')  # Per hour
 NAT_GATEWAY_DATA_PROCESSING = Decimal('0.045')  # Per GB processed
 
+# Monthly hourly cost (730 hours/month average), computed once
+HOURS_PER_MONTH = Decimal('730')
+_HOURLY_COST = NAT_GATEWAY_HOURLY_RATE * HOURS_PER_MONTH
 
-def run_command(cmd: List[str]) -> Tuple[bool, str]:
-    """Run a shell command and return success status and output."""
-    try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        return True, result.stdout
-    except subprocess.CalledProcessError as e:
-        return False, e.stderr
-    except FileNotFoundError:
-        return False, "AWS CLI not found. Please install it first."
+# CloudWatch metrics collected per gateway: (metric name, statistic, result key)
+NAT_GATEWAY_METRICS = [
+    ('BytesOutToDestination', 'Sum', 'bytes_out'),
+    ('BytesInFromSource', 'Sum', 'bytes_in'),
+    ('ActiveConnectionCount', 'Average', 'active_connections'),
+]
+
+# Metric window, computed once
+_START_7D, _END = metric_window(7)
+
+# Metric responses are cached between runs (disable with --no-cache)
+CACHE_FILE = Path.home() / '.cache' / 'aws-cost-analysis' / 'nat_gateway_metrics.json'
+CACHE_TTL_SECONDS = 3600
 
 
 def get_all_nat_gateways() -> List[Dict]:
     """Get list of all NAT Gateways."""
     print("Fetching all NAT Gateways...")
-    success, output = run_command([
+    # Deleted gateways are filtered out server-side, and only the fields used here
+    # are projected so the CLI output to parse stays small
+    success, nat_gateways, error = run_list_command([
         'aws', 'ec2', 'describe-nat-gateways',
+        '--filter', 'Name=state,Values=pending,available,failed,deleting',
+        '--query', '{NatGateways: NatGateways[].{NatGatewayId: NatGatewayId, VpcId: VpcId, SubnetId: SubnetId, '
+                   'State: State, CreateTime: CreateTime, NatGatewayAddresses: NatGatewayAddresses}}',
         '--output', 'json'
-    ])
+    ], 'NatGateways')
 
     if not success:
-        print(f"Error getting NAT Gateways: {output}")
+        print(f"Error getting NAT Gateways: {error}")
         return []
 
+    gateway_list = []
+    for nat in nat_gateways:
+        gateway_list.append({
+            'id': nat.get('NatGatewayId') or '',
+            'vpc_id': nat.get('VpcId') or '',
+            'subnet_id': nat.get('SubnetId') or '',
+            'state': nat.get('State') or '',
+            'created': nat.get('CreateTime') or '',
+            'addresses': nat.get('NatGatewayAddresses') or []
+        })
+
+    return gateway_list
+
+
+def load_metrics_cache() -> Dict:
+    """Load cached NAT Gateway metrics, or an empty cache if none is usable."""
     try:
-        data = json.loads(output) if output.strip() else {}
-        nat_gateways = data.get('NatGateways', [])
-
-        gateway_list = []
-        for nat in nat_gateways:
-            if nat.get('State') != 'deleted':
-                gateway_list.append({
-                    'id': nat.get('NatGatewayId', ''),
-                    'vpc_id': nat.get('VpcId', ''),
-                    'subnet_id': nat.get('SubnetId', ''),
-                    'state': nat.get('State', ''),
-                    'created': nat.get('CreateTime', ''),
-                    'addresses': nat.get('NatGatewayAddresses', [])
-                })
-
-        return gateway_list
-
-    except json.JSONDecodeError:
-        print("Error parsing NAT Gateway data")
-        return []
+        with open(CACHE_FILE) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
 
+def save_metrics_cache(cache: Dict):
+    """Write the NAT Gateway metrics cache atomically."""
+    try:
+        write_json_atomic(CACHE_FILE, cache)
+    except OSError as e:
+        print(f"  Warning: Could not write metrics cache: {e}")
+
+
+def get_gateways_with_metrics() -> Optional[Set[str]]:
+    """Get the ids of NAT Gateways that have CloudWatch metrics, or None if they cannot be listed."""
+    # ListMetrics returns metrics with data in the last two weeks, which covers the 7-day window.
+    # Any traffic through a gateway sends bytes to a destination, so one metric name is enough.
+    success, metrics, error = run_list_command([
+        'aws', 'cloudwatch', 'list-metrics',
+        '--namespace', 'AWS/NATGateway',
+        '--metric-name', NAT_GATEWAY_METRICS[0][0],
+        '--output', 'json'
+    ], 'Metrics')
 
-def get_nat_gateway_metrics(nat_gateway_id: str) -> Dict:
-    """Get CloudWatch metrics for a NAT Gateway (last 7 days)."""
-    end_time = datetime.utcnow()
-    start_time = end_time - timedelta(days=7)
+    if not success:
+        print(f"  Warning: Could not list NAT Gateway metrics: {error.strip()}")
+        return None
 
-    metrics = {
+    return {
+        dimension['Value']
+        for metric in metrics
+        for dimension in metric.get('Dimensions', [])
+        if dimension.get('Name') == 'NatGatewayId'
+    }
+
+
+def empty_nat_gateway_metrics() -> Dict:
+    """Metrics for a NAT Gateway with no traffic."""
+    return {
         'bytes_out': 0,
         'bytes_in': 0,
         'packets_out': 0,
         'active_connections': 0
     }
 
-    # Get BytesOutToDestination
-    success, output = run_command([
-        'aws', 'cloudwatch', 'get-metric-statistics',
-        '--namespace', 'AWS/NATGateway',
-        '--metric-name', 'BytesOutToDestination',
-        '--dimensions', f'Name=NatGatewayId,Value={nat_gateway_id}',
-        '--start-time', start_time.isoformat(),
-        '--end-time', end_time.isoformat(),
-        '--period', '604800',  # 7 days
-        '--statistics', 'Sum',
-        '--output', 'json'
-    ])
-
-    if success:
-        try:
-            data = json.loads(output)
-            datapoints = data.get('Datapoints', [])
-            if datapoints:
-                metrics['bytes_out'] = int(datapoints[0].get('Sum', 0))
-        except:
-            pass
-
-    # Get BytesInFromSource
-    success, output = run_command([
-        'aws', 'cloudwatch', 'get-metric-statistics',
-        '--namespace', 'AWS/NATGateway',
-        '--metric-name', 'BytesInFromSource',
-        '--dimensions', f'Name=NatGatewayId,Value={nat_gateway_id}',
-        '--start-time', start_time.isoformat(),
-        '--end-time', end_time.isoformat(),
-        '--period', '604800',
-        '--statistics', 'Sum',
-        '--output', 'json'
-    ])
-
-    if success:
-        try:
-            data = json.loads(output)
-            datapoints = data.get('Datapoints', [])
-            if datapoints:
-                metrics['bytes_in'] = int(datapoints[0].get('Sum', 0))
-        except:
-            pass
-
-    # Get ActiveConnectionCount
-    success, output = run_command([
-        'aws', 'cloudwatch', 'get-metric-statistics',
-        '--namespace', 'AWS/NATGateway',
-        '--metric-name', 'ActiveConnectionCount',
-        '--dimensions', f'Name=NatGatewayId,Value={nat_gateway_id}',
-        '--start-time', start_time.isoformat(),
-        '--end-time', end_time.isoformat(),
-        '--period', '604800',
-        '--statistics', 'Average',
-        '--output', 'json'
-    ])
 
-    if success:
-        try:
-            data = json.loads(output)
-            datapoints = data.get('Datapoints', [])
-            if datapoints:
-                metrics['active_connections'] = int(datapoints[0].get('Average', 0))
-        except:
-            pass
+def get_all_nat_gateway_metrics(nat_gateways: List[Dict], use_cache: bool = True) -> Dict[str, Dict]:
+    """Get CloudWatch metrics for all NAT Gateways (last 7 days), keyed by gateway id."""
+    # Cache entries are valid for the same 7-day window and a limited time
+    window = f"{_START_7D.date().isoformat()}:{_END.date().isoformat()}"
+    now = time.time()
+    cache = load_metrics_cache() if use_cache else {}
+
+    all_metrics = {}
+    for nat in nat_gateways:
+        entry = cache.get(nat['id'])
+        if entry and entry.get('window') == window and now - entry.get('fetched', 0) < CACHE_TTL_SECONDS:
+            all_metrics[nat['id']] = entry['metrics']
+
+    # Query each gateway's dimension once, even if a gateway is listed more than once
+    gateway_ids = list(dict.fromkeys(nat['id'] for nat in nat_gateways if nat['id'] not in all_metrics))
+    if not gateway_ids:
+        return all_metrics
+
+    # Gateways without any listed metrics had no traffic, so skip their queries
+    gateways_with_metrics = get_gateways_with_metrics()
+    if gateways_with_metrics is not None:
+        for gateway_id in gateway_ids:
+            if gateway_id not in gateways_with_metrics:
+                all_metrics[gateway_id] = empty_nat_gateway_metrics()
+                cache[gateway_id] = {'window': window, 'fetched': now, 'metrics': all_metrics[gateway_id]}
+        gateway_ids = [gateway_id for gateway_id in gateway_ids if gateway_id in gateways_with_metrics]
+
+    queries = []
+    for i, gateway_id in enumerate(gateway_ids):
+        for metric_name, stat, key in NAT_GATEWAY_METRICS:
+            queries.append({
+                'Id': f'm{i}_{key}',
+                'MetricStat': {
+                    'Metric': {
+                        'Namespace': 'AWS/NATGateway',
+                        'MetricName': metric_name,
+                        'Dimensions': [{'Name': 'NatGatewayId', 'Value': gateway_id}]
+                    },
+                    'Period': 604800,  # 7 days
+                    'Stat': stat
+                }
+            })
+
+    values = get_metric_data(queries, _START_7D, _END)
+
+    for i, gateway_id in enumerate(gateway_ids):
+        metrics = empty_nat_gateway_metrics()
+        for _, stat, key in NAT_GATEWAY_METRICS:
+            series = values.get(f'm{i}_{key}', [])
+            if stat == 'Average':
+                metrics[key] = int(sum(series) / len(series)) if series else 0
+            else:
+                metrics[key] = int(sum(series))
+        all_metrics[gateway_id] = metrics
 
-    return metrics
+        # Only cache gateways whose queries were all answered, so a failed fetch is retried next run
+        if all(f'm{i}_{key}' in values for _, _, key in NAT_GATEWAY_METRICS):
+            cache[gateway_id] = {'window': window, 'fetched': now, 'metrics': metrics}
+
+    if use_cache:
+        save_metrics_cache(cache)
+
+    return all_metrics
 
 
 def calculate_nat_gateway_cost(data_gb: Decimal) -> Dict:
     """Calculate NAT Gateway costs."""
-    # Monthly hourly cost (730 hours/month average)
-    hours_per_month = Decimal('730')
-    hourly_cost = NAT_GATEWAY_HOURLY_RATE * hours_per_month
-
     # Data processing cost
     data_cost = data_gb * NAT_GATEWAY_DATA_PROCESSING
 
-    total_monthly = hourly_cost + data_cost
+    total_monthly = _HOURLY_COST + data_cost
 
     return {
-        'hourly_cost': hourly_cost,
+        'hourly_cost': _HOURLY_COST,
         'data_cost': data_cost,
         'total_monthly': total_monthly
     }
@@ -172,13 +202,14 @@ def format_currency(amount: Decimal) -> str:
     return f"${amount:.2f}"
 
 
+BYTE_UNITS = ['B', 'KB', 'MB', 'GB', 'TB', 'PB']
+
+
 def format_bytes(bytes_val: int) -> str:
     """Format bytes to human readable."""
-    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-        if bytes_val < 1024.0:
-            return f"{bytes_val:.2f} {unit}"
-        bytes_val /= 1024.0
-    return f"{bytes_val:.2f} PB"
+    # Each unit is 2**10 times the previous one, so the bit length picks the unit
+    exp = max(0, min((bytes_val.bit_length() - 1) // 10, len(BYTE_UNITS) - 1))
+    return f"{bytes_val / (1 << (exp * 10)):.2f} {BYTE_UNITS[exp]}"
 
 
 def print_separator(char='=', length=80):
@@ -188,6 +219,11 @@ def print_separator(char='=', length=80):
 
 def main():
     """Main function."""
+    parser = argparse.ArgumentParser(description='Analyze NAT Gateway usage and costs.')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always fetch fresh CloudWatch metrics instead of using the local cache')
+    args = parser.parse_args()
+
     print_separator()
     print("NAT GATEWAY COST ANALYZER")
     print_separator()
@@ -212,14 +248,17 @@ def main():
     print()
 
     # Analyze each NAT Gateway
-    gateway_analysis = []
     total_monthly_cost = Decimal('0')
     unused_gateways = []
     low_usage_gateways = []
 
+    print("Fetching CloudWatch metrics for all NAT Gateways...")
+    all_metrics = get_all_nat_gateway_metrics(nat_gateways, use_cache=not args.no_cache)
+    print()
+
+    progress_lines = []
     for nat in nat_gateways:
-        print(f"Analyzing {nat['id']}...", end='', flush=True)
-        metrics = get_nat_gateway_metrics(nat['id'])
+        metrics = all_metrics[nat['id']]
 
         # Calculate total data processed (7 days, extrapolate to 30 days)
         bytes_total_7d = metrics['bytes_out'] + metrics['bytes_in']
@@ -248,17 +287,11 @@ def main():
                 'data_gb': data_gb_30d
             })
 
-        gateway_analysis.append({
-            'nat': nat,
-            'metrics': metrics,
-            'cost': costs,
-            'data_gb': data_gb_30d,
-            'unused': is_unused,
-            'low_usage': is_low_usage
-        })
-
-        print(f" {format_bytes(bytes_total_7d)}/week, {format_currency(costs['total_monthly'])}/mo")
+        progress_lines.append(
+            f"Analyzing {nat['id']}... {format_bytes(bytes_total_7d)}/week, {format_currency(costs['total_monthly'])}/mo"
+        )
 
+    sys.stdout.write('\n'.join(progress_lines) + '\n')
     print()
     print_separator('-')
     print()
@@ -286,16 +319,18 @@ def main():
         print()
 
         unused_savings = Decimal('0')
+        detail_lines = []
         for item in unused_gateways:
             nat = item['nat']
             cost = item['cost']
             unused_savings += cost
-            print(f"  • {nat['id']}")
-            print(f"    VPC: {nat['vpc_id']}")
-            print(f"    Subnet: {nat['subnet_id']}")
-            print(f"    Monthly Cost: {format_currency(cost)}")
-            print(f"    State: {nat['state']}")
-            print()
+            detail_lines.append(f"  • {nat['id']}")
+            detail_lines.append(f"    VPC: {nat['vpc_id']}")
+            detail_lines.append(f"    Subnet: {nat['subnet_id']}")
+            detail_lines.append(f"    Monthly Cost: {format_currency(cost)}")
+            detail_lines.append(f"    State: {nat['state']}")
+            detail_lines.append('')
+        sys.stdout.write('\n'.join(detail_lines) + '\n')
 
         total_savings += unused_savings
         print(f"Potential Monthly Savings: {format_currency(unused_savings)}")
@@ -312,15 +347,17 @@ def main():
         print()
         print(f"Found {len(low_usage_gateways)} low-usage NAT Gateway(s)")
         print()
+        detail_lines = []
         for item in low_usage_gateways:
             nat = item['nat']
             cost = item['cost']
             data_gb = item['data_gb']
-            print(f"  • {nat['id']}")
-            print(f"    VPC: {nat['vpc_id']}")
-            print(f"    Data Usage: {data_gb:.2f} GB/month")
-            print(f"    Monthly Cost: {format_currency(cost)}")
-            print()
+            detail_lines.append(f"  • {nat['id']}")
+            detail_lines.append(f"    VPC: {nat['vpc_id']}")
+            detail_lines.append(f"    Data Usage: {data_gb:.2f} GB/month")
+            detail_lines.append(f"    Monthly Cost: {format_currency(cost)}")
+            detail_lines.append('')
+        sys.stdout.write('\n'.join(detail_lines) + '\n')
 
         print("RECOMMENDATION: Consider using NAT Instance or VPC endpoints instead")
         print("                NAT Instance (t3.nano) costs ~$3.80/month vs ~$32.85/month for NAT Gateway")
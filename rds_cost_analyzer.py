@@ -6,162 +6,128 @@ right-sizing, and storage optimization.
 This script only reads and analyzes - it does not make any changes.
 """
 
-import subprocess
-import json
 import sys
-from typing import Dict, List, Tuple
-from decimal import Decimal
+from typing import Dict, List, NamedTuple
 from collections import defaultdict
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from aws_cli import run_list_command
 
 # AWS RDS On-Demand Pricing (USD per hour) - us-east-1 region, MySQL/PostgreSQL
 # Update these values based on your region and database engine
 RDS_ON_DEMAND_PRICING = {
-    'db.t3.micro': Decimal('0.017'),
-    'db.t3.small': Decimal('0.034'),
-    'db.t3.medium': Decimal('0.068'),
-    'db.t3.large': Decimal('0.136'),
-    'db.m5.large': Decimal('0.192'),
-    'db.m5.xlarge': Decimal('0.384'),
-    'db.m5.2xlarge': Decimal('0.768'),
-    'db.r5.large': Decimal('0.29'),
-    'db.r5.xlarge': Decimal('0.58'),
-    'db.r5.2xlarge': Decimal('1.16'),
+    'db.t3.micro': 0.017,
+    'db.t3.small': 0.034,
+    'db.t3.medium': 0.068,
+    'db.t3.large': 0.136,
+    'db.m5.large': 0.192,
+    'db.m5.xlarge': 0.384,
+    'db.m5.2xlarge': 0.768,
+    'db.r5.large': 0.29,
+    'db.r5.xlarge': 0.58,
+    'db.r5.2xlarge': 1.16,
 }
 
 # RDS Storage Pricing (per GB/month)
 STORAGE_PRICING = {
-    'gp2': Decimal('0.115'),  # General Purpose SSD
-    'gp3': Decimal('0.115'),  # General Purpose SSD (newer)
-    'io1': Decimal('0.125'),  # Provisioned IOPS SSD
-    'magnetic': Decimal('0.10'),  # Magnetic (deprecated)
+    'gp2': 0.115,  # General Purpose SSD
+    'gp3': 0.115,  # General Purpose SSD (newer)
+    'io1': 0.125,  # Provisioned IOPS SSD
+    'magnetic': 0.10,  # Magnetic (deprecated)
 }
 
 # IOPS Pricing for io1
-IOPS_PRICE = Decimal('0.10')  # per IOPS per month
+IOPS_PRICE = 0.10  # per IOPS per month
 
 # Reserved Instance discount percentages
-RI_DISCOUNT_1YEAR = Decimal('0.35')  # 35% discount
-RI_DISCOUNT_3YEAR = Decimal('0.50')  # 50% discount
+RI_DISCOUNT_1YEAR = 0.35  # 35% discount
+RI_DISCOUNT_3YEAR = 0.50  # 50% discount
 
 # Hours for calculations
 HOURS_PER_MONTH = 730
 
+# Monthly on-demand price per instance class, computed once
+_MONTHLY_PRICE = {db_class: price * HOURS_PER_MONTH for db_class, price in RDS_ON_DEMAND_PRICING.items()}
 
-def run_command(cmd: List[str]) -> Tuple[bool, str]:
-    """Run a shell command and return success status and output."""
-    try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        return True, result.stdout
-    except subprocess.CalledProcessError as e:
-        return False, e.stderr
-    except FileNotFoundError:
-        return False, "AWS CLI not found. Please install it first."
+
+class RDSInstance(NamedTuple):
+    """An RDS instance, with fields in describe-db-instances --query projection order."""
+    id: str
+    class_: str
+    engine: str
+    status: str
+    storage_gb: int = 0
+    storage_type: str = 'gp2'
+    iops: int = 0
+    multi_az: bool = False
+    engine_version: str = 'unknown'
 
 
-def get_all_rds_instances() -> List[Dict]:
+def get_all_rds_instances() -> List[RDSInstance]:
     """Get list of all RDS instances."""
     print("Fetching all RDS instances...")
 
-    success, output = run_command([
+    success, instance_data, error = run_list_command([
         'aws', 'rds', 'describe-db-instances',
-        '--query', 'DBInstances[].[DBInstanceIdentifier,DBInstanceClass,Engine,DBInstanceStatus,'
-                   'AllocatedStorage,StorageType,Iops,MultiAZ,EngineVersion]',
+        '--query', '{DBInstances: DBInstances[].[DBInstanceIdentifier,DBInstanceClass,Engine,DBInstanceStatus,'
+                   'AllocatedStorage,StorageType,Iops,MultiAZ,EngineVersion]}',
         '--output', 'json'
-    ])
+    ], 'DBInstances')
 
     if not success:
-        print(f"Error getting RDS instances: {output}")
+        print(f"Error getting RDS instances: {error}")
         return []
 
-    try:
-        instance_data = json.loads(output) if output.strip() else []
-        if instance_data is None:
-            instance_data = []
-
-        instances = []
-        for inst in instance_data:
-            if inst and len(inst) >= 4:
-                db_id = inst[0]
-                db_class = inst[1]
-                engine = inst[2]
-                status = inst[3]
-                storage = inst[4] if len(inst) > 4 else 0
-                storage_type = inst[5] if len(inst) > 5 else 'gp2'
-                iops = inst[6] if len(inst) > 6 else 0
-                multi_az = inst[7] if len(inst) > 7 else False
-                engine_version = inst[8] if len(inst) > 8 else 'unknown'
-
-                instances.append({
-                    'id': db_id,
-                    'class': db_class,
-                    'engine': engine,
-                    'status': status,
-                    'storage_gb': storage or 0,
-                    'storage_type': storage_type,
-                    'iops': iops,
-                    'multi_az': multi_az,
-                    'engine_version': engine_version
-                })
-
-        return instances
-
-    except json.JSONDecodeError:
-        print("Error parsing RDS instance data")
-        return []
+    instances = []
+    for inst in instance_data:
+        if inst and len(inst) >= 4:
+            # Rows follow the --query projection order; missing trailing fields use the defaults
+            instance = RDSInstance(*inst[:len(RDSInstance._fields)])
+            instances.append(instance._replace(storage_gb=instance.storage_gb or 0))
+
+    return instances
 
 
 def get_reserved_instances() -> Dict[str, int]:
     """Get current RDS Reserved Instances count by class."""
     print("Fetching RDS Reserved Instances...")
 
-    success, output = run_command([
+    success, ri_data, error = run_list_command([
         'aws', 'rds', 'describe-reserved-db-instances',
-        '--query', 'ReservedDBInstances[?State==`active`].[DBInstanceClass,DBInstanceCount]',
+        '--query', '{ReservedDBInstances: ReservedDBInstances[?State==`active`].[DBInstanceClass,DBInstanceCount]}',
         '--output', 'json'
-    ])
+    ], 'ReservedDBInstances')
 
     if not success:
-        print(f"  Warning: Could not fetch RDS RIs: {output}")
+        print(f"  Warning: Could not fetch RDS RIs: {error}")
         return {}
 
-    try:
-        ri_data = json.loads(output) if output.strip() else []
-        if ri_data is None:
-            ri_data = []
-
-        ri_count = defaultdict(int)
-        for ri in ri_data:
-            if ri and len(ri) >= 2:
-                db_class = ri[0]
-                count = ri[1] or 1
-                ri_count[db_class] += count
+    ri_count = defaultdict(int)
+    for ri in ri_data:
+        if ri and len(ri) >= 2:
+            db_class = ri[0]
+            count = ri[1] or 1
+            ri_count[db_class] += count
 
-        return dict(ri_count)
+    return dict(ri_count)
 
-    except json.JSONDecodeError:
-        print("  Warning: Error parsing RDS RI data")
-        return {}
 
-
-def get_instance_price(db_class: str) -> Decimal:
+def get_instance_price(db_class: str) -> float:
     """Get on-demand hourly price for RDS instance class."""
     if db_class in RDS_ON_DEMAND_PRICING:
         return RDS_ON_DEMAND_PRICING[db_class]
 
     # Estimate if not in pricing table
     print(f"  Warning: No pricing data for {db_class}, using estimate")
-    return Decimal('0.10')
+    return 0.10
 
 
-def calculate_instance_cost(db_class: str, multi_az: bool = False) -> Decimal:
+@lru_cache(maxsize=256)
+def calculate_instance_cost(db_class: str, multi_az: bool = False) -> float:
     """Calculate monthly instance cost."""
-    hourly_price = get_instance_price(db_class)
-    monthly_cost = hourly_price * HOURS_PER_MONTH
+    monthly_cost = _MONTHLY_PRICE.get(db_class)
+    if monthly_cost is None:
+        monthly_cost = get_instance_price(db_class) * HOURS_PER_MONTH
 
     # Multi-AZ deployments cost 2x
     if multi_az:
@@ -170,25 +136,25 @@ def calculate_instance_cost(db_class: str, multi_az: bool = False) -> Decimal:
     return monthly_cost
 
 
-def calculate_storage_cost(storage_gb: int, storage_type: str, iops: int = 0) -> Decimal:
+def calculate_storage_cost(storage_gb: int, storage_type: str, iops: int = 0) -> float:
     """Calculate monthly storage cost."""
     storage_price = STORAGE_PRICING.get(storage_type, STORAGE_PRICING['gp2'])
-    storage_cost = Decimal(storage_gb) * storage_price
+    storage_cost = storage_gb * storage_price
 
     # Add IOPS cost for io1
     if storage_type == 'io1' and iops > 0:
-        storage_cost += Decimal(iops) * IOPS_PRICE
+        storage_cost += iops * IOPS_PRICE
 
     return storage_cost
 
 
-def calculate_total_cost(instance: Dict) -> Decimal:
+def calculate_total_cost(instance: RDSInstance) -> float:
     """Calculate total monthly cost for an RDS instance."""
-    instance_cost = calculate_instance_cost(instance['class'], instance['multi_az'])
+    instance_cost = calculate_instance_cost(instance.class_, instance.multi_az)
     storage_cost = calculate_storage_cost(
-        instance['storage_gb'],
-        instance['storage_type'],
-        instance['iops'] or 0
+        instance.storage_gb,
+        instance.storage_type,
+        instance.iops or 0
     )
     return instance_cost + storage_cost
 
@@ -198,27 +164,27 @@ def calculate_ri_savings(db_class: str, count: int, multi_az: bool = False) -> D
     monthly_ondemand = calculate_instance_cost(db_class, multi_az) * count
     yearly_ondemand = monthly_ondemand * 12
 
-    # RI costs (with discount)
-    monthly_ri_1year = monthly_ondemand * (1 - RI_DISCOUNT_1YEAR)
-    yearly_ri_1year = monthly_ri_1year * 12
+    # Savings are the discounted share of the on-demand cost; RI costs are the rest
+    savings_1year = yearly_ondemand * RI_DISCOUNT_1YEAR
+    yearly_ri_1year = yearly_ondemand - savings_1year
 
-    monthly_ri_3year = monthly_ondemand * (1 - RI_DISCOUNT_3YEAR)
-    yearly_ri_3year = monthly_ri_3year * 12
+    savings_3year = yearly_ondemand * RI_DISCOUNT_3YEAR
+    yearly_ri_3year = yearly_ondemand - savings_3year
 
     return {
         'monthly_ondemand': monthly_ondemand,
         'yearly_ondemand': yearly_ondemand,
-        'monthly_ri_1year': monthly_ri_1year,
+        'monthly_ri_1year': yearly_ri_1year / 12,
         'yearly_ri_1year': yearly_ri_1year,
-        'savings_1year': yearly_ondemand - yearly_ri_1year,
-        'monthly_ri_3year': monthly_ri_3year,
+        'savings_1year': savings_1year,
+        'monthly_ri_3year': yearly_ri_3year / 12,
         'yearly_ri_3year': yearly_ri_3year,
-        'savings_3year': yearly_ondemand - yearly_ri_3year,
+        'savings_3year': savings_3year,
     }
 
 
-def format_currency(amount: Decimal) -> str:
-    """Format decimal as currency."""
+def format_currency(amount: float) -> str:
+    """Format amount as currency."""
     return f"${amount:.2f}"
 
 
@@ -234,8 +200,13 @@ def main():
     print_separator()
     print()
 
-    # Get all RDS instances
-    instances = get_all_rds_instances()
+    # Get all RDS instances and Reserved Instances (each CLI call is a separate
+    # process, so start both at once)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        instances_future = executor.submit(get_all_rds_instances)
+        reserved_future = executor.submit(get_reserved_instances)
+        instances = instances_future.result()
+        reserved_instances = reserved_future.result()
 
     if not instances:
         print("No RDS instances found or error accessing AWS.")
@@ -243,13 +214,10 @@ def main():
 
     print(f"Found {len(instances)} RDS instance(s)\n")
 
-    # Get Reserved Instances
-    reserved_instances = get_reserved_instances()
-
     # Categorize instances
-    available_instances = [i for i in instances if i['status'] == 'available']
-    stopped_instances = [i for i in instances if i['status'] == 'stopped']
-    other_instances = [i for i in instances if i['status'] not in ['available', 'stopped']]
+    available_instances = [i for i in instances if i.status == 'available']
+    stopped_instances = [i for i in instances if i.status == 'stopped']
+    other_instances = [i for i in instances if i.status not in ['available', 'stopped']]
 
     print_separator()
     print("RDS INSTANCE SUMMARY")
@@ -265,11 +233,11 @@ def main():
     # Group by instance class
     class_summary = defaultdict(list)
     for inst in available_instances:
-        class_summary[inst['class']].append(inst)
+        class_summary[inst.class_].append(inst)
 
     print("Instance Classes:")
     for db_class, inst_list in sorted(class_summary.items()):
-        multi_az_count = sum(1 for i in inst_list if i['multi_az'])
+        multi_az_count = sum(1 for i in inst_list if i.multi_az)
         print(f"  {db_class}: {len(inst_list)} instance(s)", end='')
         if multi_az_count > 0:
             print(f" ({multi_az_count} Multi-AZ)")
@@ -297,26 +265,29 @@ def main():
     print_separator()
     print()
 
-    total_monthly_cost = Decimal('0')
-    total_instance_cost = Decimal('0')
-    total_storage_cost = Decimal('0')
-
-    for inst in available_instances:
-        instance_cost = calculate_instance_cost(inst['class'], inst['multi_az'])
-        storage_cost = calculate_storage_cost(inst['storage_gb'], inst['storage_type'], inst['iops'] or 0)
+    # Compute each cost column once; the totals and the io1 review below reuse them
+    instance_costs = [calculate_instance_cost(inst.class_, inst.multi_az) for inst in available_instances]
+    storage_costs = [
+        calculate_storage_cost(inst.storage_gb, inst.storage_type, inst.iops or 0)
+        for inst in available_instances
+    ]
+    total_instance_cost = sum(instance_costs)
+    total_storage_cost = sum(storage_costs)
+    total_monthly_cost = total_instance_cost + total_storage_cost
+
+    cost_lines = []
+    for inst, instance_cost, storage_cost in zip(available_instances, instance_costs, storage_costs):
         total_cost = instance_cost + storage_cost
 
-        total_monthly_cost += total_cost
-        total_instance_cost += instance_cost
-        total_storage_cost += storage_cost
-
-        print(f"{inst['id']}:")
-        print(f"  Class: {inst['class']}, Engine: {inst['engine']}")
-        print(f"  Multi-AZ: {inst['multi_az']}, Storage: {inst['storage_gb']} GB ({inst['storage_type']})")
-        print(f"  Instance Cost: {format_currency(instance_cost)}/month")
-        print(f"  Storage Cost: {format_currency(storage_cost)}/month")
-        print(f"  Total: {format_currency(total_cost)}/month")
-        print()
+        cost_lines.append(f"{inst.id}:")
+        cost_lines.append(f"  Class: {inst.class_}, Engine: {inst.engine}")
+        cost_lines.append(f"  Multi-AZ: {inst.multi_az}, Storage: {inst.storage_gb} GB ({inst.storage_type})")
+        cost_lines.append(f"  Instance Cost: {format_currency(instance_cost)}/month")
+        cost_lines.append(f"  Storage Cost: {format_currency(storage_cost)}/month")
+        cost_lines.append(f"  Total: {format_currency(total_cost)}/month")
+        cost_lines.append('')
+    if cost_lines:
+        sys.stdout.write('\n'.join(cost_lines) + '\n')
 
     print_separator('-')
     print(f"TOTAL INSTANCE COST: {format_currency(total_instance_cost)}/month")
@@ -332,17 +303,18 @@ def main():
     print_separator()
     print()
 
-    total_1year_savings = Decimal('0')
-    total_3year_savings = Decimal('0')
+    total_1year_savings = 0.0
+    total_3year_savings = 0.0
     has_recommendations = False
 
+    recommendation_lines = []
     for db_class, inst_list in sorted(class_summary.items()):
         count = len(inst_list)
         ri_covered = reserved_instances.get(db_class, 0)
         uncovered = count - ri_covered
 
         # Check if any are Multi-AZ (for accurate calculation)
-        has_multi_az = any(i['multi_az'] for i in inst_list)
+        has_multi_az = any(i.multi_az for i in inst_list)
 
         if uncovered > 0:
             has_recommendations = True
@@ -351,28 +323,34 @@ def main():
             total_1year_savings += savings['savings_1year']
             total_3year_savings += savings['savings_3year']
 
-            print(f"{db_class} - {uncovered} instance(s) recommended for RI")
+            recommendation_lines.append(f"{db_class} - {uncovered} instance(s) recommended for RI")
             if has_multi_az:
-                print(f"  (Includes Multi-AZ pricing)")
-            print(f"  Current On-Demand Cost: {format_currency(savings['yearly_ondemand'])}/year")
-            print()
-            print(f"  1-Year RI:")
-            print(f"    Yearly Cost: {format_currency(savings['yearly_ri_1year'])}")
-            print(f"    Yearly Savings: {format_currency(savings['savings_1year'])} ({RI_DISCOUNT_1YEAR * 100:.0f}% off)")
-            print()
-            print(f"  3-Year RI:")
-            print(f"    Yearly Cost: {format_currency(savings['yearly_ri_3year'])}")
-            print(f"    Yearly Savings: {format_currency(savings['savings_3year'])} ({RI_DISCOUNT_3YEAR * 100:.0f}% off)")
-            print()
-            print_separator('-')
-            print()
+                recommendation_lines.append(f"  (Includes Multi-AZ pricing)")
+            recommendation_lines.append(f"  Current On-Demand Cost: {format_currency(savings['yearly_ondemand'])}/year")
+            recommendation_lines.append('')
+            recommendation_lines.append(f"  1-Year RI:")
+            recommendation_lines.append(f"    Yearly Cost: {format_currency(savings['yearly_ri_1year'])}")
+            recommendation_lines.append(f"    Yearly Savings: {format_currency(savings['savings_1year'])} ({RI_DISCOUNT_1YEAR * 100:.0f}% off)")
+            recommendation_lines.append('')
+            recommendation_lines.append(f"  3-Year RI:")
+            recommendation_lines.append(f"    Yearly Cost: {format_currency(savings['yearly_ri_3year'])}")
+            recommendation_lines.append(f"    Yearly Savings: {format_currency(savings['savings_3year'])} ({RI_DISCOUNT_3YEAR * 100:.0f}% off)")
+            recommendation_lines.append('')
+            recommendation_lines.append('-' * 80)
+            recommendation_lines.append('')
+    if recommendation_lines:
+        sys.stdout.write('\n'.join(recommendation_lines) + '\n')
 
     if not has_recommendations:
         print("All running instances are covered by Reserved Instances!")
         print()
 
     # Storage Optimization
-    io1_instances = [i for i in available_instances if i['storage_type'] == 'io1']
+    io1_instances = [
+        (inst, storage_cost)
+        for inst, storage_cost in zip(available_instances, storage_costs)
+        if inst.storage_type == 'io1'
+    ]
     if io1_instances:
         print_separator()
         print("STORAGE OPTIMIZATION OPPORTUNITIES")
@@ -381,18 +359,20 @@ def main():
         print(f"Found {len(io1_instances)} instance(s) using Provisioned IOPS (io1)")
         print()
 
-        for inst in io1_instances:
-            storage_cost = calculate_storage_cost(inst['storage_gb'], inst['storage_type'], inst['iops'] or 0)
-            gp2_cost = calculate_storage_cost(inst['storage_gb'], 'gp2', 0)
+        storage_lines = []
+        for inst, storage_cost in io1_instances:
+            gp2_cost = calculate_storage_cost(inst.storage_gb, 'gp2', 0)
             savings = storage_cost - gp2_cost
 
             if savings > 0:
-                print(f"{inst['id']}:")
-                print(f"  Current (io1): {format_currency(storage_cost)}/month")
-                print(f"  If using gp2: {format_currency(gp2_cost)}/month")
-                print(f"  Monthly Savings: {format_currency(savings)}")
-                print(f"  Yearly Savings: {format_currency(savings * 12)}")
-                print()
+                storage_lines.append(f"{inst.id}:")
+                storage_lines.append(f"  Current (io1): {format_currency(storage_cost)}/month")
+                storage_lines.append(f"  If using gp2: {format_currency(gp2_cost)}/month")
+                storage_lines.append(f"  Monthly Savings: {format_currency(savings)}")
+                storage_lines.append(f"  Yearly Savings: {format_currency(savings * 12)}")
+                storage_lines.append('')
+        if storage_lines:
+            sys.stdout.write('\n'.join(storage_lines) + '\n')
 
         print("NOTE: Only migrate from io1 to gp2/gp3 if IOPS requirements allow")
         print_separator('-')
@@ -408,65 +388,37 @@ def main():
 
     if has_recommendations:
         recommendations.append(
-            f"1. PURCHASE Reserved Instances for cost savings:"
-        )
-        recommendations.append(
-            f"   - 1-Year RI: Save {format_currency(total_1year_savings)}/year"
-        )
-        recommendations.append(
+            f"1. PURCHASE Reserved Instances for cost savings:\n"
+            f"   - 1-Year RI: Save {format_currency(total_1year_savings)}/year\n"
             f"   - 3-Year RI: Save {format_currency(total_3year_savings)}/year"
         )
 
     if io1_instances:
         recommendations.append(
-            f"2. REVIEW {len(io1_instances)} instance(s) using Provisioned IOPS storage"
-        )
-        recommendations.append(
-            "   - Consider migrating to gp3 for better price/performance"
-        )
-        recommendations.append(
+            f"2. REVIEW {len(io1_instances)} instance(s) using Provisioned IOPS storage\n"
+            "   - Consider migrating to gp3 for better price/performance\n"
             "   - gp3 offers up to 16,000 IOPS at base price"
         )
 
     recommendations.append(
-        f"3. MONITOR database utilization:"
-    )
-    recommendations.append(
-        "   - Use CloudWatch metrics (CPU, Memory, IOPS)"
-    )
-    recommendations.append(
-        "   - Right-size instances based on actual usage"
-    )
-    recommendations.append(
-        "   - Consider Aurora Serverless for variable workloads"
-    )
-
-    recommendations.append(
-        f"4. IMPLEMENT cost controls:"
-    )
-    recommendations.append(
-        "   - Stop non-production databases outside business hours"
-    )
-    recommendations.append(
-        "   - Use snapshot lifecycle policies"
-    )
-    recommendations.append(
+        "3. MONITOR database utilization:\n"
+        "   - Use CloudWatch metrics (CPU, Memory, IOPS)\n"
+        "   - Right-size instances based on actual usage\n"
+        "   - Consider Aurora Serverless for variable workloads\n"
+        "4. IMPLEMENT cost controls:\n"
+        "   - Stop non-production databases outside business hours\n"
+        "   - Use snapshot lifecycle policies\n"
         "   - Enable automated backups with appropriate retention"
     )
 
     if stopped_instances:
         recommendations.append(
-            f"5. REVIEW {len(stopped_instances)} stopped instance(s)"
-        )
-        recommendations.append(
-            "   - Stopped RDS instances still incur storage charges"
-        )
-        recommendations.append(
+            f"5. REVIEW {len(stopped_instances)} stopped instance(s)\n"
+            "   - Stopped RDS instances still incur storage charges\n"
             "   - Consider snapshots and termination for long-term stopped instances"
         )
 
-    for rec in recommendations:
-        print(rec)
+    print('\n'.join(recommendations))
 
     print()
 
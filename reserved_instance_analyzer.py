@@ -4,76 +4,111 @@ Reserved Instance Analyzer
 Analyzes EC2 instances and recommends Reserved Instance purchases for cost savings.
 """
 
-import subprocess
 import json
 import sys
-from typing import Dict, List, Tuple
-from decimal import Decimal
-from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from collections import Counter, defaultdict
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from aws_cli import get_on_demand_price, run_command, run_list_command
 
 # AWS EC2 On-Demand Pricing (USD per hour) - us-east-1 region
 # Update these values based on your region and instance types
 # These are sample prices - update with actual pricing
 ON_DEMAND_PRICING = {
-    't2.micro': Decimal('0.0116'),
-    't2.small': Decimal('0.023'),
-    't2.medium': Decimal('0.0464'),
-    't3.micro': Decimal('0.0104'),
-    't3.small': Decimal('0.0208'),
-    't3.medium': Decimal('0.0416'),
-    'm5.large': Decimal('0.096'),
-    'm5.xlarge': Decimal('0.192'),
-    'm5.2xlarge': Decimal('0.384'),
-    'c5.large': Decimal('0.085'),
-    'c5.xlarge': Decimal('0.17'),
-    'c5.2xlarge': Decimal('0.34'),
+    't2.micro': 0.0116,
+    't2.small': 0.023,
+    't2.medium': 0.0464,
+    't3.micro': 0.0104,
+    't3.small': 0.0208,
+    't3.medium': 0.0416,
+    'm5.large': 0.096,
+    'm5.xlarge': 0.192,
+    'm5.2xlarge': 0.384,
+    'c5.large': 0.085,
+    'c5.xlarge': 0.17,
+    'c5.2xlarge': 0.34,
 }
 
+# On-demand prices (Linux, shared tenancy) are looked up via the AWS Pricing API in each
+# instance's region, or in PRICING_REGION when the region is unknown; ON_DEMAND_PRICING
+# is used for instance types the API cannot price
+PRICING_REGION = 'us-east-1'
+
 # Reserved Instance discount percentages (1-year, no upfront)
 # Typical savings range from 30-40% for 1-year, 40-60% for 3-year
-RI_DISCOUNT_1YEAR = Decimal('0.35')  # 35% discount
-RI_DISCOUNT_3YEAR = Decimal('0.50')  # 50% discount
+RI_DISCOUNT_1YEAR = 0.35  # 35% discount
+RI_DISCOUNT_3YEAR = 0.50  # 50% discount
+
+# Hours for calculations (24/7 operation)
+HOURS_PER_MONTH = 730
+
+# Regions queried concurrently
+MAX_WORKERS = 16
 
 # Minimum running hours per month to recommend RI (e.g., 500 hours = ~69% uptime)
 MIN_HOURS_FOR_RI = 500
 
 
-def run_command(cmd: List[str]) -> Tuple[bool, str]:
-    """Run a shell command and return success status and output."""
-    try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        return True, result.stdout
-    except subprocess.CalledProcessError as e:
-        return False, e.stderr
-    except FileNotFoundError:
-        return False, "AWS CLI not found. Please install it first."
-
-
-def get_all_instances() -> List[Dict]:
-    """Get list of all EC2 instances."""
-    print("Fetching all EC2 instances...")
-
+def get_regions() -> List[Optional[str]]:
+    """Get the regions enabled for the account; None stands for the AWS CLI's default region."""
     success, output = run_command([
-        'aws', 'ec2', 'describe-instances',
-        '--query', 'Reservations[].Instances[].[InstanceId,InstanceType,State.Name,Platform,Tags]',
+        'aws', 'ec2', 'describe-regions',
+        '--query', 'Regions[].RegionName',
         '--output', 'json'
     ])
 
-    if not success:
-        print(f"Error getting instances: {output}")
-        return []
+    if success:
+        try:
+            regions = json.loads(output) if output.strip() else []
+            if regions:
+                return sorted(regions)
+        except json.JSONDecodeError:
+            pass
+
+    print(f"  Warning: Could not list regions, using the default region: {output.strip()}")
+    return [None]
+
+
+def region_args(region: Optional[str]) -> List[str]:
+    """AWS CLI arguments selecting a region."""
+    return ['--region', region] if region else []
+
+
+def describe_instances(region: Optional[str]) -> Tuple[bool, List, str]:
+    """Run describe-instances in one region and return the projected instance rows."""
+    # Only running and stopped instances are analyzed, so filter out the rest server-side
+    return run_list_command([
+        'aws', 'ec2', 'describe-instances',
+        '--filters', 'Name=instance-state-name,Values=running,stopped',
+        '--query', '{Instances: Reservations[].Instances[].[InstanceId,InstanceType,State.Name,Platform,Tags]}',
+        '--output', 'json'
+    ] + region_args(region), 'Instances')
+
+
+def describe_reserved_instances(region: Optional[str]) -> Tuple[bool, str]:
+    """Run describe-reserved-instances for active RIs in one region."""
+    return run_command([
+        'aws', 'ec2', 'describe-reserved-instances',
+        '--query', 'ReservedInstances[?State==`active`].[InstanceType,InstanceCount]',
+        '--output', 'json'
+    ] + region_args(region))
+
 
-    try:
-        instance_data = json.loads(output) if output.strip() else []
-        if instance_data is None:
-            instance_data = []
+def get_all_instances(regions: List[Optional[str]]) -> List[Dict]:
+    """Get list of all EC2 instances across regions."""
+    print("Fetching all EC2 instances...")
+
+    # Each region is an independent call, so query them all at once
+    with ThreadPoolExecutor(max_workers=min(len(regions), MAX_WORKERS)) as executor:
+        results = list(executor.map(describe_instances, regions))
+
+    instances = []
+    for region, (success, instance_data, error) in zip(regions, results):
+        if not success:
+            print(f"Error getting instances in {region or 'default region'}: {error}")
+            continue
 
-        instances = []
         for inst in instance_data:
             if inst and len(inst) >= 3:
                 instance_id = inst[0]
@@ -83,111 +118,114 @@ def get_all_instances() -> List[Dict]:
                 tags = inst[4] if len(inst) > 4 and inst[4] else []
 
                 # Extract Name tag
-                name = "No Name"
-                if tags:
-                    for tag in tags:
-                        if tag.get('Key') == 'Name':
-                            name = tag.get('Value', 'No Name')
-                            break
+                name = next((tag.get('Value', 'No Name') for tag in tags if tag.get('Key') == 'Name'), "No Name")
 
                 instances.append({
                     'id': instance_id,
                     'type': instance_type,
                     'state': state,
                     'platform': platform,
-                    'name': name
+                    'name': name,
+                    'region': region
                 })
 
-        return instances
+    return instances
 
-    except json.JSONDecodeError:
-        print("Error parsing instance data")
-        return []
 
-
-def get_reserved_instances() -> Dict[str, int]:
-    """Get current Reserved Instances count by type."""
+def get_reserved_instances(regions: List[Optional[str]]) -> Dict[Tuple[Optional[str], str], int]:
+    """Get current Reserved Instances count by region and type."""
     print("Fetching Reserved Instances...")
 
-    success, output = run_command([
-        'aws', 'ec2', 'describe-reserved-instances',
-        '--query', 'ReservedInstances[?State==`active`].[InstanceType,InstanceCount]',
-        '--output', 'json'
-    ])
+    with ThreadPoolExecutor(max_workers=min(len(regions), MAX_WORKERS)) as executor:
+        results = list(executor.map(describe_reserved_instances, regions))
 
-    if not success:
-        print(f"  Warning: Could not fetch RIs: {output}")
-        return {}
+    ri_count = defaultdict(int)
+    for region, (success, output) in zip(regions, results):
+        if not success:
+            print(f"  Warning: Could not fetch RIs in {region or 'default region'}: {output}")
+            continue
 
-    try:
-        ri_data = json.loads(output) if output.strip() else []
-        if ri_data is None:
-            ri_data = []
+        try:
+            ri_data = json.loads(output) if output.strip() else []
+        except json.JSONDecodeError:
+            print(f"  Warning: Error parsing RI data for {region or 'default region'}")
+            continue
 
-        ri_count = defaultdict(int)
-        for ri in ri_data:
+        for ri in ri_data or []:
             if ri and len(ri) >= 2:
                 instance_type = ri[0]
                 count = ri[1] or 1
-                ri_count[instance_type] += count
-
-        return dict(ri_count)
-
-    except json.JSONDecodeError:
-        print("  Warning: Error parsing RI data")
-        return {}
-
-
-def get_instance_price(instance_type: str) -> Decimal:
-    """Get on-demand price for instance type."""
-    # Return price from lookup, or estimate based on similar instance
+                # Regional RIs only cover instances in their own region
+                ri_count[(region, instance_type)] += count
+
+    return dict(ri_count)
+
+
+@lru_cache(maxsize=256)
+def get_instance_price(instance_type: str, region: Optional[str] = None) -> float:
+    """Get on-demand price for instance type in a region."""
+    price = get_on_demand_price('AmazonEC2', {
+        'instanceType': instance_type,
+        'regionCode': region or PRICING_REGION,
+        'operatingSystem': 'Linux',
+        'tenancy': 'Shared',
+        'preInstalledSw': 'NA',
+        'capacitystatus': 'Used',
+        'licenseModel': 'No License required',
+        'marketoption': 'OnDemand',
+    })
+    if price is not None:
+        return price
+
+    # Otherwise fall back to the pricing table
     if instance_type in ON_DEMAND_PRICING:
         return ON_DEMAND_PRICING[instance_type]
 
     # If not in pricing table, return a default estimate
     print(f"  Warning: No pricing data for {instance_type}, using estimate")
-    return Decimal('0.10')  # Default estimate
+    return 0.10  # Default estimate
 
 
-def calculate_monthly_cost(instance_type: str, hours_per_month: int = 730) -> Decimal:
+@lru_cache(maxsize=256)
+def calculate_monthly_cost(instance_type: str, region: Optional[str] = None,
+                           hours_per_month: int = HOURS_PER_MONTH) -> float:
     """Calculate monthly on-demand cost."""
-    hourly_price = get_instance_price(instance_type)
-    return hourly_price * Decimal(hours_per_month)
+    hourly_price = get_instance_price(instance_type, region)
+    return hourly_price * hours_per_month
 
 
-def calculate_ri_savings(instance_type: str, count: int, hours_per_month: int = 730) -> Dict:
-    """Calculate savings with Reserved Instances."""
-    hourly_price = get_instance_price(instance_type)
+def instance_label(region: Optional[str], instance_type: str) -> str:
+    """Label an instance type with its region for the report."""
+    return f"{instance_type} ({region})" if region else instance_type
 
-    # On-demand costs
-    monthly_ondemand = hourly_price * Decimal(hours_per_month) * count
-    yearly_ondemand = monthly_ondemand * 12
 
-    # RI costs (with discount)
-    hourly_ri_1year = hourly_price * (1 - RI_DISCOUNT_1YEAR)
-    hourly_ri_3year = hourly_price * (1 - RI_DISCOUNT_3YEAR)
+def calculate_ri_savings(monthly_cost: float, count: int) -> Dict:
+    """Calculate savings with Reserved Instances from the monthly on-demand cost of one instance."""
+    monthly_ondemand = monthly_cost * count
+    yearly_ondemand = monthly_ondemand * 12
 
-    monthly_ri_1year = hourly_ri_1year * Decimal(hours_per_month) * count
-    yearly_ri_1year = monthly_ri_1year * 12
+    # Savings are the discounted share of the on-demand cost; RI costs are the rest
+    savings_1year = yearly_ondemand * RI_DISCOUNT_1YEAR
+    yearly_ri_1year = yearly_ondemand - savings_1year
 
-    monthly_ri_3year = hourly_ri_3year * Decimal(hours_per_month) * count
-    yearly_ri_3year = monthly_ri_3year * 12
+    savings_3year = yearly_ondemand * RI_DISCOUNT_3YEAR
+    yearly_ri_3year = yearly_ondemand - savings_3year
 
     return {
         'monthly_ondemand': monthly_ondemand,
         'yearly_ondemand': yearly_ondemand,
-        'monthly_ri_1year': monthly_ri_1year,
+        'monthly_ri_1year': yearly_ri_1year / 12,
         'yearly_ri_1year': yearly_ri_1year,
-        'savings_1year': yearly_ondemand - yearly_ri_1year,
-        'monthly_ri_3year': monthly_ri_3year,
+        'savings_1year': savings_1year,
+        'monthly_ri_3year': yearly_ri_3year / 12,
         'yearly_ri_3year': yearly_ri_3year,
-        'savings_3year': yearly_ondemand - yearly_ri_3year,
+        'savings_3year': savings_3year,
     }
 
 
-def format_currency(amount: Decimal) -> str:
-    """Format decimal as currency."""
-    return f"${amount:.2f}"
+def format_currency(amount: float) -> str:
+    """Format amount as currency."""
+    return f"${amount:,.2f}"
 
 
 def print_separator(char='=', length=80):
@@ -202,8 +240,15 @@ def main():
     print_separator()
     print()
 
-    # Get all instances
-    instances = get_all_instances()
+    regions = get_regions()
+
+    # Get all instances and current Reserved Instances (the calls are
+    # independent, so start both at once)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        instances_future = executor.submit(get_all_instances, regions)
+        reserved_future = executor.submit(get_reserved_instances, regions)
+        instances = instances_future.result()
+        reserved_instances = reserved_future.result()
 
     if not instances:
         print("No instances found or error accessing AWS.")
@@ -211,9 +256,6 @@ def main():
 
     print(f"Found {len(instances)} instance(s)\n")
 
-    # Get current Reserved Instances
-    reserved_instances = get_reserved_instances()
-
     # Analyze running instances
     running_instances = [i for i in instances if i['state'] == 'running']
     stopped_instances = [i for i in instances if i['state'] == 'stopped']
@@ -227,22 +269,30 @@ def main():
     print(f"  Stopped: {len(stopped_instances)}")
     print()
 
-    # Group running instances by type
-    instance_types = defaultdict(list)
-    for inst in running_instances:
-        instance_types[inst['type']].append(inst)
+    # Count running instances by region and type, matching how RIs apply
+    type_counts = Counter((inst['region'], inst['type']) for inst in running_instances)
 
     print_separator('-')
     print()
 
+    # Monthly on-demand cost of one instance of each type in each region, priced once for
+    # both sections below. Each is a separate Pricing API call, so look them up at once.
+    price_keys = sorted(type_counts)
+    with ThreadPoolExecutor(max_workers=max(1, min(len(price_keys), MAX_WORKERS))) as executor:
+        monthly_costs = dict(zip(price_keys, executor.map(
+            calculate_monthly_cost,
+            [inst_type for _, inst_type in price_keys],
+            [region for region, _ in price_keys]
+        )))
+
     # Display current RI coverage
     if reserved_instances:
         print_separator()
         print("CURRENT RESERVED INSTANCES")
         print_separator()
         print()
-        for inst_type, count in reserved_instances.items():
-            print(f"  {inst_type}: {count} instance(s)")
+        for (region, inst_type), count in reserved_instances.items():
+            print(f"  {instance_label(region, inst_type)}: {count} instance(s)")
         print()
         print_separator('-')
         print()
@@ -253,24 +303,26 @@ def main():
     print_separator()
     print()
 
-    total_monthly_cost = Decimal('0')
-    for inst_type, instances_list in instance_types.items():
-        count = len(instances_list)
+    total_monthly_cost = 0.0
+    cost_lines = []
+    for (region, inst_type), count in type_counts.items():
         # Subtract any existing RIs
-        ri_covered = reserved_instances.get(inst_type, 0)
+        ri_covered = reserved_instances.get((region, inst_type), 0)
         uncovered = max(0, count - ri_covered)
 
-        monthly_cost = calculate_monthly_cost(inst_type, 730) * count
+        monthly_cost = monthly_costs[(region, inst_type)] * count
         total_monthly_cost += monthly_cost
 
-        print(f"{inst_type}:")
-        print(f"  Running Instances: {count}")
+        cost_lines.append(f"{instance_label(region, inst_type)}:")
+        cost_lines.append(f"  Running Instances: {count}")
         if ri_covered > 0:
-            print(f"  Covered by RIs: {ri_covered}")
-            print(f"  Uncovered (On-Demand): {uncovered}")
-        print(f"  Monthly Cost: {format_currency(monthly_cost)}")
-        print(f"  Yearly Cost: {format_currency(monthly_cost * 12)}")
-        print()
+            cost_lines.append(f"  Covered by RIs: {ri_covered}")
+            cost_lines.append(f"  Uncovered (On-Demand): {uncovered}")
+        cost_lines.append(f"  Monthly Cost: {format_currency(monthly_cost)}")
+        cost_lines.append(f"  Yearly Cost: {format_currency(monthly_cost * 12)}")
+        cost_lines.append('')
+    if cost_lines:
+        sys.stdout.write('\n'.join(cost_lines) + '\n')
 
     print_separator('-')
     print(f"TOTAL MONTHLY COST: {format_currency(total_monthly_cost)}")
@@ -289,35 +341,37 @@ def main():
     print_separator('-')
     print()
 
-    total_1year_savings = Decimal('0')
-    total_3year_savings = Decimal('0')
+    total_1year_savings = 0.0
+    total_3year_savings = 0.0
     has_recommendations = False
+    recommendation_lines = []
 
-    for inst_type, instances_list in sorted(instance_types.items()):
-        count = len(instances_list)
-        ri_covered = reserved_instances.get(inst_type, 0)
+    for (region, inst_type), count in sorted(type_counts.items()):
+        ri_covered = reserved_instances.get((region, inst_type), 0)
         uncovered = count - ri_covered
 
         if uncovered > 0:
             has_recommendations = True
-            savings = calculate_ri_savings(inst_type, uncovered, 730)
+            savings = calculate_ri_savings(monthly_costs[(region, inst_type)], uncovered)
 
             total_1year_savings += savings['savings_1year']
             total_3year_savings += savings['savings_3year']
 
-            print(f"{inst_type} - {uncovered} instance(s) recommended for RI")
-            print(f"  Current On-Demand Cost: {format_currency(savings['yearly_ondemand'])}/year")
-            print()
-            print(f"  1-Year RI (No Upfront):")
-            print(f"    Yearly Cost: {format_currency(savings['yearly_ri_1year'])}")
-            print(f"    Yearly Savings: {format_currency(savings['savings_1year'])} ({RI_DISCOUNT_1YEAR * 100:.0f}% off)")
-            print()
-            print(f"  3-Year RI (No Upfront):")
-            print(f"    Yearly Cost: {format_currency(savings['yearly_ri_3year'])}")
-            print(f"    Yearly Savings: {format_currency(savings['savings_3year'])} ({RI_DISCOUNT_3YEAR * 100:.0f}% off)")
-            print()
-            print_separator('-')
-            print()
+            recommendation_lines.append(f"{instance_label(region, inst_type)} - {uncovered} instance(s) recommended for RI")
+            recommendation_lines.append(f"  Current On-Demand Cost: {format_currency(savings['yearly_ondemand'])}/year")
+            recommendation_lines.append('')
+            recommendation_lines.append(f"  1-Year RI (No Upfront):")
+            recommendation_lines.append(f"    Yearly Cost: {format_currency(savings['yearly_ri_1year'])}")
+            recommendation_lines.append(f"    Yearly Savings: {format_currency(savings['savings_1year'])} ({RI_DISCOUNT_1YEAR * 100:.0f}% off)")
+            recommendation_lines.append('')
+            recommendation_lines.append(f"  3-Year RI (No Upfront):")
+            recommendation_lines.append(f"    Yearly Cost: {format_currency(savings['yearly_ri_3year'])}")
+            recommendation_lines.append(f"    Yearly Savings: {format_currency(savings['savings_3year'])} ({RI_DISCOUNT_3YEAR * 100:.0f}% off)")
+            recommendation_lines.append('')
+            recommendation_lines.append('-' * 80)
+            recommendation_lines.append('')
+    if recommendation_lines:
+        sys.stdout.write('\n'.join(recommendation_lines) + '\n')
 
     if not has_recommendations:
         print("All running instances are already covered by Reserved Instances!")
@@ -367,10 +421,9 @@ def main():
     print()
     print_separator('-')
     print()
-    print(f"NOTE: This analysis assumes 24/7 operation (730 hours/month)")
+    print(f"NOTE: This analysis assumes 24/7 operation ({HOURS_PER_MONTH} hours/month)")
     print(f"Discount rates: 1-Year RI = {RI_DISCOUNT_1YEAR * 100:.0f}%, 3-Year RI = {RI_DISCOUNT_3YEAR * 100:.0f}%")
     print("Update ON_DEMAND_PRICING and discount rates for accurate calculations")
-    print("Pricing based on us-east-1 region")
     print_separator()
 
 
@@ -8,36 +8,79 @@ import subprocess
 import json
 import re
 import sys
-from typing import Dict, List, Tuple
-from decimal import Decimal
+import tempfile
+from typing import Dict, List, Optional, Tuple
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from aws_cli import get_metric_data, get_on_demand_price, get_session_env, metric_window, run_command
 
 # AWS S3 Pricing (USD per GB/month) - us-east-1 region
 # Update these values based on your region
 PRICING = {
-    'STANDARD': Decimal('0.023'),
-    'STANDARD_IA': Decimal('0.0125'),
-    'INTELLIGENT_TIERING': Decimal('0.023'),  # Frequent access tier
-    'ONEZONE_IA': Decimal('0.01'),
-    'GLACIER_IR': Decimal('0.004'),  # Glacier Instant Retrieval
-    'GLACIER': Decimal('0.0036'),
-    'DEEP_ARCHIVE': Decimal('0.00099'),
+    'STANDARD': 0.023,
+    'STANDARD_IA': 0.0125,
+    'INTELLIGENT_TIERING': 0.023,  # Frequent access tier
+    'ONEZONE_IA': 0.01,
+    'GLACIER_IR': 0.004,  # Glacier Instant Retrieval
+    'GLACIER': 0.0036,
+    'DEEP_ARCHIVE': 0.00099,
+    'REDUCED_REDUNDANCY': 0.024,
 }
 
+# Region whose storage prices are looked up via the AWS Pricing API; PRICING
+# is used for storage classes the API cannot price
+PRICING_REGION = 'us-east-1'
+
+# AWS Pricing API volume types for the PRICING storage classes
+S3_VOLUME_TYPES = {
+    'STANDARD': 'Standard',
+    'STANDARD_IA': 'Standard - Infrequent Access',
+    'INTELLIGENT_TIERING': 'Intelligent-Tiering Frequent Access',
+    'ONEZONE_IA': 'One Zone - Infrequent Access',
+    'GLACIER_IR': 'Glacier Instant Retrieval',
+    'GLACIER': 'Amazon Glacier',
+    'DEEP_ARCHIVE': 'Glacier Deep Archive',
+    'REDUCED_REDUNDANCY': 'Reduced Redundancy',
+}
 
-def run_command(cmd: List[str]) -> Tuple[bool, str]:
-    """Run a shell command and return success status and output."""
-    try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        return True, result.stdout
-    except subprocess.CalledProcessError as e:
-        return False, e.stderr
-    except FileNotFoundError:
-        return False, "AWS CLI not found. Please install it first."
+# CloudWatch BucketSizeBytes storage types mapped to PRICING keys. Overhead and
+# staging bytes are billed at the rate of the class noted by AWS (Standard for
+# the S3 index of archived objects).
+S3_STORAGE_TYPES = {
+    'StandardStorage': 'STANDARD',
+    'StandardIAStorage': 'STANDARD_IA',
+    'StandardIASizeOverhead': 'STANDARD_IA',
+    'StandardIAObjectOverhead': 'STANDARD_IA',
+    'IntelligentTieringFAStorage': 'INTELLIGENT_TIERING',
+    'IntelligentTieringIAStorage': 'INTELLIGENT_TIERING',
+    'IntelligentTieringAAStorage': 'INTELLIGENT_TIERING',
+    'IntelligentTieringAIAStorage': 'INTELLIGENT_TIERING',
+    'IntelligentTieringDAAStorage': 'INTELLIGENT_TIERING',
+    'OneZoneIAStorage': 'ONEZONE_IA',
+    'OneZoneIASizeOverhead': 'ONEZONE_IA',
+    'ReducedRedundancyStorage': 'REDUCED_REDUNDANCY',
+    'GlacierInstantRetrievalStorage': 'GLACIER_IR',
+    'GlacierInstantRetrievalSizeOverhead': 'GLACIER_IR',
+    'GlacierStorage': 'GLACIER',
+    'GlacierObjectOverhead': 'GLACIER',
+    'GlacierS3ObjectOverhead': 'STANDARD',
+    'GlacierStagingStorage': 'STANDARD',
+    'DeepArchiveStorage': 'DEEP_ARCHIVE',
+    'DeepArchiveObjectOverhead': 'DEEP_ARCHIVE',
+    'DeepArchiveS3ObjectOverhead': 'STANDARD',
+    'DeepArchiveStagingStorage': 'STANDARD',
+}
+
+BYTES_PER_GB = 1073741824
+
+# Summary line of `aws s3 ls --summarize`, in bytes
+_TOTAL_RE = re.compile(r'Total Size:\s*(\d+)')
+
+# Buckets analyzed concurrently
+MAX_WORKERS = 16
+
+# S3 publishes storage metrics once a day, so look back two days for the latest datapoint
+_START_2D, _END = metric_window(2)
 
 
 def get_all_buckets() -> List[str]:
@@ -61,75 +104,53 @@ def get_all_buckets() -> List[str]:
     return buckets
 
 
-def parse_size(size_str: str) -> Decimal:
-    """Convert human-readable size to GB."""
-    size_str = size_str.strip()
-
-    # Match number and unit
-    match = re.match(r'([\d.]+)\s*([KMGTP]i?B?)?', size_str, re.IGNORECASE)
-    if not match:
-        return Decimal('0')
-
-    value = Decimal(match.group(1))
-    unit = (match.group(2) or 'B').upper()
-
-    # Convert to GB
-    multipliers = {
-        'B': Decimal('0.000000001'),
-        'KB': Decimal('0.000001'),
-        'KIB': Decimal('0.000001'),
-        'MB': Decimal('0.001'),
-        'MIB': Decimal('0.001'),
-        'GB': Decimal('1'),
-        'GIB': Decimal('1'),
-        'TB': Decimal('1000'),
-        'TIB': Decimal('1000'),
-        'PB': Decimal('1000000'),
-        'PIB': Decimal('1000000'),
-    }
-
-    for key in multipliers:
-        if unit.startswith(key):
-            return value * multipliers[key]
-
-    return value * Decimal('0.000000001')  # Default to bytes
-
-
-def get_bucket_size(bucket_name: str) -> Decimal:
-    """Get total size of a bucket in GB."""
-    print(f"  Analyzing {bucket_name}...", end='', flush=True)
-
-    success, output = run_command([
-        'aws', 's3', 'ls',
-        f's3://{bucket_name}',
-        '--recursive',
-        '--summarize',
-        '--human-readable'
-    ])
-
-    if not success:
-        print(f" ERROR")
-        print(f"    Error: {output}")
-        return Decimal('0')
-
-    # Look for "Total Size: X.XX GiB" or similar
-    size_match = re.search(r'Total Size:\s*([\d.]+\s*[KMGTP]i?B)', output, re.IGNORECASE)
-
-    if size_match:
-        size_str = size_match.group(1)
-        size_gb = parse_size(size_str)
-        print(f" {size_str} ({size_gb:.2f} GB)")
-        return size_gb
-
-    print(" 0 GB (empty)")
-    return Decimal('0')
-
-
-def get_storage_class_distribution(bucket_name: str) -> Dict[str, Decimal]:
+def get_bucket_size(bucket_name: str) -> Tuple[float, str]:
+    """Get total size of a bucket in GB and a progress status line."""
+    # The listing has a line per object, so stream it and keep only the
+    # summary instead of buffering the whole output. stderr goes to a file so
+    # a chatty CLI cannot fill its pipe and stall while stdout is being read.
+    with tempfile.TemporaryFile('w+') as stderr_file:
+        try:
+            process = subprocess.Popen(
+                [
+                    'aws', 's3', 'ls',
+                    f's3://{bucket_name}',
+                    '--recursive',
+                    '--summarize'
+                ],
+                stdout=subprocess.PIPE,
+                stderr=stderr_file,
+                text=True,
+                env=get_session_env()
+            )
+        except FileNotFoundError:
+            return 0.0, "ERROR\n    Error: AWS CLI not found. Please install it first."
+
+        # Look for "Total Size: <bytes>"
+        size_match = None
+        with process:
+            for line in process.stdout:
+                if 'Total Size:' in line:
+                    size_match = _TOTAL_RE.search(line)
+
+        stderr_file.seek(0)
+        error = stderr_file.read()
+
+    if process.returncode != 0:
+        return 0.0, f"ERROR\n    Error: {error}"
+
+    size_bytes = int(size_match.group(1)) if size_match else 0
+    if size_bytes:
+        size_gb = size_bytes / BYTES_PER_GB
+        return size_gb, f"{size_gb:.2f} GB"
+
+    return 0.0, "0 GB (empty)"
+
+
+def get_storage_class_distribution(bucket_name: str) -> Dict[str, float]:
     """Get distribution of storage classes in a bucket."""
-    # Using CloudWatch metrics or S3 Inventory would be more accurate,
-    # but this is a simplified approach using aws s3api
-
+    # Fallback for buckets without CloudWatch storage metrics. A single CLI
+    # process pages through the whole listing.
     success, output = run_command([
         'aws', 's3api', 'list-objects-v2',
         '--bucket', bucket_name,
@@ -142,50 +163,156 @@ def get_storage_class_distribution(bucket_name: str) -> Dict[str, Decimal]:
         return {}
 
     try:
-        objects = json.loads(output) if output.strip() else []
-        if objects is None:  # Handle case where AWS returns null for empty buckets
-            objects = []
-        distribution = {}
-
-        for obj in objects:
-            if obj and len(obj) >= 2:
-                storage_class = obj[0] if obj[0] else 'STANDARD'
-                size_bytes = obj[1] or 0
-                size_gb = Decimal(size_bytes) / Decimal('1073741824')  # Convert to GB
-
-                if storage_class not in distribution:
-                    distribution[storage_class] = Decimal('0')
-                distribution[storage_class] += size_gb
-
-        return distribution
+        # AWS returns null for empty buckets
+        objects = (json.loads(output) if output.strip() else None) or []
     except json.JSONDecodeError:
         return {}
 
+    # Sum whole bytes per class and convert to GB once at the end
+    # The projection yields one [StorageClass, Size] pair per object, so unpack directly
+    bytes_by_class = defaultdict(int)
+    for storage_class, size_bytes in objects:
+        bytes_by_class[storage_class or 'STANDARD'] += size_bytes or 0
 
-def calculate_monthly_cost(size_gb: Decimal, storage_class: str) -> Decimal:
-    """Calculate monthly cost for given size and storage class."""
-    price_per_gb = PRICING.get(storage_class, PRICING['STANDARD'])
-    return size_gb * price_per_gb
+    return {
+        storage_class: size_bytes / BYTES_PER_GB
+        for storage_class, size_bytes in bytes_by_class.items()
+    }
 
 
-def calculate_savings(size_gb: Decimal, current_class: str, target_class: str) -> Dict:
-    """Calculate savings when moving from current to target storage class."""
-    current_cost = calculate_monthly_cost(size_gb, current_class)
-    target_cost = calculate_monthly_cost(size_gb, target_class)
-    savings = current_cost - target_cost
-    savings_percent = (savings / current_cost * 100) if current_cost > 0 else Decimal('0')
+def get_bucket_region(bucket_name: str) -> Optional[str]:
+    """Get the region of a bucket, or None to use the default region."""
+    success, output = run_command([
+        'aws', 's3api', 'get-bucket-location',
+        '--bucket', bucket_name,
+        '--query', 'LocationConstraint',
+        '--output', 'text'
+    ])
+    if not success:
+        return None
+
+    # us-east-1 has no location constraint, and old eu-west-1 buckets report "EU"
+    location = output.strip()
+    if location in ('', 'None'):
+        return 'us-east-1'
+    if location == 'EU':
+        return 'eu-west-1'
+    return location
+
+
+def get_bucket_storage(bucket_name: str) -> Tuple[float, Dict[str, float], str]:
+    """Get total size of a bucket in GB, its storage class distribution and a progress status line."""
+    queries = [
+        {
+            'Id': f's{i}',
+            'MetricStat': {
+                'Metric': {
+                    'Namespace': 'AWS/S3',
+                    'MetricName': 'BucketSizeBytes',
+                    'Dimensions': [
+                        {'Name': 'BucketName', 'Value': bucket_name},
+                        {'Name': 'StorageType', 'Value': storage_type}
+                    ]
+                },
+                'Period': 86400,  # 1 day
+                'Stat': 'Average'
+            }
+        }
+        for i, storage_type in enumerate(S3_STORAGE_TYPES)
+    ]
+    queries.append({
+        'Id': 'objects',
+        'MetricStat': {
+            'Metric': {
+                'Namespace': 'AWS/S3',
+                'MetricName': 'NumberOfObjects',
+                'Dimensions': [
+                    {'Name': 'BucketName', 'Value': bucket_name},
+                    {'Name': 'StorageType', 'Value': 'AllStorageTypes'}
+                ]
+            },
+            'Period': 86400,  # 1 day
+            'Stat': 'Average'
+        }
+    })
+    # S3 publishes storage metrics only in the bucket's own region
+    values = get_metric_data(queries, _START_2D, _END, region=get_bucket_region(bucket_name))
+
+    # Sum whole bytes per class and convert to GB once at the end
+    bytes_by_class = defaultdict(int)
+    for i, storage_class in enumerate(S3_STORAGE_TYPES.values()):
+        series = values.get(f's{i}')
+        if series:
+            # Newest datapoint comes first
+            bytes_by_class[storage_class] += int(series[0])
+
+    if bytes_by_class:
+        distribution = {
+            storage_class: size_bytes / BYTES_PER_GB
+            for storage_class, size_bytes in bytes_by_class.items()
+        }
+        size_gb = sum(distribution.values())
+        return size_gb, distribution, f"{size_gb:.2f} GB"
+
+    # Empty buckets have nothing to list
+    objects = values.get('objects')
+    if objects and objects[0] == 0:
+        return 0.0, {}, "0 GB (empty)"
+
+    # No datapoints yet (new bucket), so list the objects instead
+    size_gb, status = get_bucket_size(bucket_name)
+    if size_gb == 0:
+        return 0.0, {}, status
+    return size_gb, get_storage_class_distribution(bucket_name), status
+
+
+def analyze_bucket(bucket_name: str) -> Dict:
+    """Get size and primary storage class of a bucket."""
+    size_gb, distribution, status = get_bucket_storage(bucket_name)
+
+    # If we have distribution data, use it; otherwise assume STANDARD
+    if distribution:
+        primary_class = max(distribution, key=distribution.get)
+    else:
+        primary_class = 'STANDARD'
 
     return {
-        'current_cost': current_cost,
-        'target_cost': target_cost,
-        'savings': savings,
-        'savings_percent': savings_percent
+        'name': bucket_name,
+        'size_gb': size_gb,
+        'storage_class': primary_class,
+        'distribution': distribution,
+        'status': status
     }
 
 
-def format_currency(amount: Decimal) -> str:
-    """Format decimal as currency."""
-    return f"${amount:.2f}"
+def get_storage_price(storage_class: str) -> Optional[float]:
+    """Get the first-tier price per GB/month of a storage class from the AWS Pricing API."""
+    return get_on_demand_price('AmazonS3', {
+        'regionCode': PRICING_REGION,
+        'productFamily': 'Storage',
+        'volumeType': S3_VOLUME_TYPES[storage_class],
+    })
+
+
+def update_pricing():
+    """Replace PRICING entries with current prices from the AWS Pricing API where available."""
+    with ThreadPoolExecutor(max_workers=len(S3_VOLUME_TYPES)) as executor:
+        prices = list(executor.map(get_storage_price, S3_VOLUME_TYPES))
+
+    for storage_class, price in zip(S3_VOLUME_TYPES, prices):
+        if price is not None:
+            PRICING[storage_class] = price
+
+
+def calculate_monthly_cost(size_gb: float, storage_class: str) -> float:
+    """Calculate monthly cost for given size and storage class."""
+    price_per_gb = PRICING.get(storage_class, PRICING['STANDARD'])
+    return size_gb * price_per_gb
+
+
+def format_currency(amount: float) -> str:
+    """Format amount as currency."""
+    return f"${amount:,.2f}"
 
 
 def print_separator(char='=', length=80):
@@ -210,51 +337,43 @@ def main():
     print(f"Found {len(buckets)} bucket(s)\n")
     print_separator('-')
 
-    # Analyze each bucket
-    bucket_data = []
-    total_size = Decimal('0')
-
-    for bucket in buckets:
-        size_gb = get_bucket_size(bucket)
-        total_size += size_gb
+    # Analyze buckets concurrently (each bucket is independent I/O); map keeps the bucket order
+    with ThreadPoolExecutor(max_workers=min(len(buckets), MAX_WORKERS)) as executor:
+        bucket_data = list(executor.map(analyze_bucket, buckets))
 
-        # Try to get storage class distribution
-        distribution = get_storage_class_distribution(bucket)
+    total_size = sum(bucket['size_gb'] for bucket in bucket_data)
+    progress_lines = [f"  Analyzing {bucket['name']}... {bucket['status']}" for bucket in bucket_data]
+    sys.stdout.write('\n'.join(progress_lines) + '\n')
 
-        # If we have distribution data, use it; otherwise assume STANDARD
-        if distribution:
-            primary_class = max(distribution, key=distribution.get)
-        else:
-            primary_class = 'STANDARD'
-
-        bucket_data.append({
-            'name': bucket,
-            'size_gb': size_gb,
-            'storage_class': primary_class,
-            'distribution': distribution
-        })
+    # Empty buckets cost nothing and have nothing to move, so leave them out of the report
+    bucket_data = [bucket for bucket in bucket_data if bucket['size_gb'] > 0]
 
     print_separator('-')
     print()
 
+    update_pricing()
+
     # Calculate costs
     print_separator()
     print("CURRENT COSTS")
     print_separator()
     print()
 
-    total_current_cost = Decimal('0')
-
-    for bucket in bucket_data:
-        if bucket['size_gb'] > 0:
-            cost = calculate_monthly_cost(bucket['size_gb'], bucket['storage_class'])
-            total_current_cost += cost
-
-            print(f"Bucket: {bucket['name']}")
-            print(f"  Size: {bucket['size_gb']:.2f} GB")
-            print(f"  Storage Class: {bucket['storage_class']}")
-            print(f"  Monthly Cost: {format_currency(cost)}")
-            print()
+    # Cost columns for every bucket, computed once and shared by the sections below
+    current_costs = [calculate_monthly_cost(bucket['size_gb'], bucket['storage_class']) for bucket in bucket_data]
+    glacier_ir_costs = [bucket['size_gb'] * PRICING['GLACIER_IR'] for bucket in bucket_data]
+    deep_archive_costs = [bucket['size_gb'] * PRICING['DEEP_ARCHIVE'] for bucket in bucket_data]
+    total_current_cost = sum(current_costs)
+
+    cost_lines = []
+    for bucket, cost in zip(bucket_data, current_costs):
+        cost_lines.append(f"Bucket: {bucket['name']}")
+        cost_lines.append(f"  Size: {bucket['size_gb']:.2f} GB")
+        cost_lines.append(f"  Storage Class: {bucket['storage_class']}")
+        cost_lines.append(f"  Monthly Cost: {format_currency(cost)}")
+        cost_lines.append('')
+    if cost_lines:
+        sys.stdout.write('\n'.join(cost_lines) + '\n')
 
     print_separator('-')
     print(f"TOTAL SIZE: {total_size:.2f} GB")
@@ -275,21 +394,20 @@ def main():
         print("(Instant access, cheaper than Standard)")
         print_separator('-')
 
-        glacier_ir_total_cost = Decimal('0')
-        glacier_ir_total_savings = Decimal('0')
-
-        for bucket in bucket_data:
-            if bucket['size_gb'] > 0:
-                calc = calculate_savings(bucket['size_gb'], bucket['storage_class'], 'GLACIER_IR')
-                glacier_ir_total_cost += calc['target_cost']
-                glacier_ir_total_savings += calc['savings']
-
-                if calc['savings'] > 0:
-                    print(f"{bucket['name']}:")
-                    print(f"  Current: {format_currency(calc['current_cost'])}/mo ({bucket['storage_class']})")
-                    print(f"  Glacier IR: {format_currency(calc['target_cost'])}/mo")
-                    print(f"  Savings: {format_currency(calc['savings'])}/mo ({calc['savings_percent']:.1f}%)")
-                    print()
+        glacier_ir_total_cost = sum(glacier_ir_costs)
+        glacier_ir_total_savings = total_current_cost - glacier_ir_total_cost
+
+        savings_lines = []
+        for bucket, current_cost, target_cost in zip(bucket_data, current_costs, glacier_ir_costs):
+            savings = current_cost - target_cost
+            if savings > 0:
+                savings_lines.append(f"{bucket['name']}:")
+                savings_lines.append(f"  Current: {format_currency(current_cost)}/mo ({bucket['storage_class']})")
+                savings_lines.append(f"  Glacier IR: {format_currency(target_cost)}/mo")
+                savings_lines.append(f"  Savings: {format_currency(savings)}/mo ({savings / current_cost * 100:.1f}%)")
+                savings_lines.append('')
+        if savings_lines:
+            sys.stdout.write('\n'.join(savings_lines) + '\n')
 
         print_separator('-')
         print(f"Total Monthly Cost with Glacier IR: {format_currency(glacier_ir_total_cost)}")
@@ -303,21 +421,20 @@ def main():
         print("(12-hour retrieval, lowest cost)")
         print_separator('-')
 
-        deep_archive_total_cost = Decimal('0')
-        deep_archive_total_savings = Decimal('0')
-
-        for bucket in bucket_data:
-            if bucket['size_gb'] > 0:
-                calc = calculate_savings(bucket['size_gb'], bucket['storage_class'], 'DEEP_ARCHIVE')
-                deep_archive_total_cost += calc['target_cost']
-                deep_archive_total_savings += calc['savings']
-
-                if calc['savings'] > 0:
-                    print(f"{bucket['name']}:")
-                    print(f"  Current: {format_currency(calc['current_cost'])}/mo ({bucket['storage_class']})")
-                    print(f"  Deep Archive: {format_currency(calc['target_cost'])}/mo")
-                    print(f"  Savings: {format_currency(calc['savings'])}/mo ({calc['savings_percent']:.1f}%)")
-                    print()
+        deep_archive_total_cost = sum(deep_archive_costs)
+        deep_archive_total_savings = total_current_cost - deep_archive_total_cost
+
+        savings_lines = []
+        for bucket, current_cost, target_cost in zip(bucket_data, current_costs, deep_archive_costs):
+            savings = current_cost - target_cost
+            if savings > 0:
+                savings_lines.append(f"{bucket['name']}:")
+                savings_lines.append(f"  Current: {format_currency(current_cost)}/mo ({bucket['storage_class']})")
+                savings_lines.append(f"  Deep Archive: {format_currency(target_cost)}/mo")
+                savings_lines.append(f"  Savings: {format_currency(savings)}/mo ({savings / current_cost * 100:.1f}%)")
+                savings_lines.append('')
+        if savings_lines:
+            sys.stdout.write('\n'.join(savings_lines) + '\n')
 
         print_separator('-')
         print(f"Total Monthly Cost with Deep Archive: {format_currency(deep_archive_total_cost)}")